@@ -1,4 +1,13 @@
 import streamlit as st
+from dotenv import load_dotenv
+
+# Loaded before the core modules are imported, so GROQ_API_KEY and any
+# env-driven settings kept in .env are visible to the warm-up threads below.
+load_dotenv()
+
+from core.index_registry import get_index_registry
+from core.models import start_warm_up
+from core.roadmaps import start_roadmap_pregeneration
 
 # -------------------- Page Config --------------------
 st.set_page_config(
@@ -7,6 +16,12 @@ st.set_page_config(
     layout="wide"
 )
 
+# -------------------- Model Warm-up --------------------
+# Loads the shared embedding model and Groq client in the background on the
+# first visit, so the feature pages never pay the model load on a click.
+start_warm_up()
+start_roadmap_pregeneration()
+
 # -------------------- Header Section --------------------
 st.markdown(
     """
@@ -106,6 +121,19 @@ st.info(
     icon="ℹ️"
 )
 
+# -------------------- Index Memory --------------------
+index_registry = get_index_registry()
+with st.expander("🧠 Shared index memory"):
+    st.caption(
+        f"{index_registry.total_bytes() / 1024 ** 2:.1f} MB of "
+        f"{index_registry.max_bytes / 1024 ** 2:.0f} MB budget in use"
+    )
+    index_stats = index_registry.stats()
+    if index_stats:
+        st.dataframe(index_stats, use_container_width=True)
+    else:
+        st.write("No documents are loaded yet.")
+
 # -------------------- Footer --------------------
 st.markdown(
     """
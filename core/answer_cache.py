@@ -0,0 +1,96 @@
+import os
+import threading
+import time
+
+import streamlit as st
+
+from core.storage import connect, nearest_row, unit_vector
+
+# --------------------------------------------------
+# Settings
+# --------------------------------------------------
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", str(7 * 24 * 3600)))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "5000"))
+
+# --------------------------------------------------
+# Semantic answer cache
+# --------------------------------------------------
+# Answers are stored per (namespace, corpus) together with the question
+# embedding; a new question hits when its cosine similarity to a cached
+# question reaches ANSWER_CACHE_THRESHOLD.
+class AnswerCache:
+    def __init__(self, conn=None):
+        self.conn = conn or connect("answers")
+        self._lock = threading.Lock()
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY,
+                namespace TEXT NOT NULL,
+                corpus TEXT NOT NULL,
+                question TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                answer TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS answers_scope "
+            "ON answers (namespace, corpus)"
+        )
+
+    def lookup(self, namespace: str, corpus: str, question_vector):
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT id, embedding FROM answers "
+                "WHERE namespace = ? AND corpus = ? AND created >= ?",
+                (namespace, corpus, time.time() - ANSWER_CACHE_TTL)
+            ).fetchall()
+            entry_id = nearest_row(rows, question_vector, ANSWER_CACHE_THRESHOLD)
+            if entry_id is None:
+                return None
+
+            self.conn.execute(
+                "UPDATE answers SET last_used = ? WHERE id = ?",
+                (time.time(), entry_id)
+            )
+            return self.conn.execute(
+                "SELECT answer FROM answers WHERE id = ?", (entry_id,)
+            ).fetchone()[0]
+
+    def store(self, namespace: str, corpus: str, question: str, question_vector, answer: str):
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO answers "
+                "(namespace, corpus, question, embedding, answer, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    namespace,
+                    corpus,
+                    question,
+                    unit_vector(question_vector).tobytes(),
+                    answer,
+                    now,
+                    now,
+                )
+            )
+            self._evict(now)
+
+    def _evict(self, now: float):
+        self.conn.execute(
+            "DELETE FROM answers WHERE created < ?", (now - ANSWER_CACHE_TTL,)
+        )
+        self.conn.execute(
+            "DELETE FROM answers WHERE id IN ("
+            "SELECT id FROM answers ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (ANSWER_CACHE_MAX_ENTRIES,)
+        )
+
+
+@st.cache_resource
+def get_answer_cache():
+    return AnswerCache()
@@ -0,0 +1,160 @@
+import numpy as np
+
+# --------------------------------------------------
+# Settings
+# --------------------------------------------------
+# Separators from coarsest to finest, as in RecursiveCharacterTextSplitter.
+# A chunk ends at the latest paragraph break that still fills at least
+# MIN_FILL of chunk_size, else the latest line break, else space; only
+# unbroken runs of text are cut mid-word.
+SEPARATORS = ("\n\n", "\n", " ")
+MIN_FILL = 0.75
+
+# --------------------------------------------------
+# Chunker
+# --------------------------------------------------
+class Chunker:
+    # Produces (start, end) character spans into the text instead of copied
+    # strings. Boundaries are found with C-level str.rfind/str.find scans of
+    # each chunk's window only, so chunking is linear in the text length and
+    # a chunk's span depends on nothing past start + chunk_size.
+    def __init__(self, chunk_size: int, chunk_overlap: int):
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    def _end(self, text: str, start: int, limit: int):
+        # (end, separator) for the chunk starting at start; separator is None
+        # for a hard cut.
+        min_end = start + int(self.chunk_size * MIN_FILL)
+        for separator in SEPARATORS:
+            # rfind only matches separators wholly inside the window.
+            position = text.rfind(separator, min_end, limit + 1)
+            if position != -1:
+                return position, separator
+        return limit, None
+
+    def _next_start(self, text: str, start: int, end: int, separator) -> int:
+        # Overlap is made of whole trailing pieces at the level the chunk was
+        # cut (paragraphs, lines or words) totalling at most chunk_overlap,
+        # so paragraph-cut chunks usually start fresh, like the recursive
+        # splitter's merge.
+        lower = max(end - self.chunk_overlap, start + 1)
+        if separator is None:
+            position = text.find(" ", lower, end)
+            return position + 1 if position != -1 else lower
+        position = text.find(separator, lower, end)
+        if position == -1:
+            return end
+        return position + len(separator)
+
+    def _spans(self, text: str, final: bool, start: int):
+        n_chars = len(text)
+        starts, ends = [], []
+
+        while start < n_chars:
+            limit = start + self.chunk_size
+            if limit >= n_chars:
+                if not final:
+                    # The last window may still grow with more text.
+                    break
+                end, separator = n_chars, None
+            else:
+                end, separator = self._end(text, start, limit)
+
+            chunk_start, chunk_end = start, end
+            while chunk_start < chunk_end and text[chunk_start].isspace():
+                chunk_start += 1
+            while chunk_end > chunk_start and text[chunk_end - 1].isspace():
+                chunk_end -= 1
+            if chunk_end > chunk_start:
+                starts.append(chunk_start)
+                ends.append(chunk_end)
+
+            if end >= n_chars:
+                start = n_chars
+                break
+            next_start = self._next_start(text, start, end, separator)
+            start = next_start if start < next_start <= end else end
+
+        return (
+            np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64), start
+        )
+
+    def spans(self, text: str, start: int = 0):
+        # Spans are offsets into text; chunking begins at `start`.
+        starts, ends, _ = self._spans(text, True, start)
+        return starts, ends
+
+    def partial_spans(self, text: str, start: int = 0):
+        # For text that will be continued: the spans of every chunk already
+        # complete, plus the offset to resume from once more text arrives
+        # (the raw start of the last, still open, window). Resuming there
+        # gives the same spans as chunking the whole text at once.
+        return self._spans(text, False, start)
+
+    def split_text(self, text: str):
+        starts, ends = self.spans(text)
+        return [text[start:end] for start, end in zip(starts.tolist(), ends.tolist())]
+
+# --------------------------------------------------
+# Benchmark: python -m core.chunker
+# --------------------------------------------------
+if __name__ == "__main__":
+    import random
+    import time
+
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    random.seed(0)
+    vocabulary = [
+        "".join(random.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(length))
+        for length in random.choices(range(2, 11), k=5000)
+    ]
+
+    def make_page():
+        paragraphs = []
+        for _ in range(random.randint(3, 6)):
+            lines = [
+                " ".join(random.choices(vocabulary, k=random.randint(8, 14)))
+                for _ in range(random.randint(3, 8))
+            ]
+            paragraphs.append("\n".join(lines))
+        return "\n\n".join(paragraphs)
+
+    pages = [make_page() for _ in range(1000)]
+    chunker = Chunker(1000, 200)
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+
+    # PDF text extraction rarely keeps blank lines between paragraphs, and
+    # some PDFs yield no line breaks at all; the recursive splitter then
+    # splits on ever smaller separators and re-merges many tiny pieces.
+    layouts = {
+        "paragraphs": lambda page: page,
+        "lines": lambda page: page.replace("\n\n", "\n"),
+        "no breaks": lambda page: page.replace("\n", " "),
+    }
+
+    print(
+        f"{'layout':<11} {'pages':>5} {'chars':>9} {'recursive':>10} "
+        f"{'chunker':>9} {'speed-up':>8} {'chunks':>11}"
+    )
+    for layout, transform in layouts.items():
+        for n_pages in (250, 500, 1000):
+            text = "\n".join(transform(page) for page in pages[:n_pages])
+
+            started = time.perf_counter()
+            reference = splitter.split_text(text)
+            recursive_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            starts, _ = chunker.spans(text)
+            chunker_seconds = time.perf_counter() - started
+
+            print(
+                f"{layout:<11} {n_pages:>5} {len(text):>9} "
+                f"{recursive_seconds:>9.3f}s {chunker_seconds:>8.3f}s "
+                f"{recursive_seconds / chunker_seconds:>7.1f}x "
+                f"{len(reference):>5}/{len(starts):<5}"
+            )
@@ -0,0 +1,79 @@
+import asyncio
+import os
+import queue
+import threading
+
+# --------------------------------------------------
+# Settings
+# --------------------------------------------------
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))
+
+# --------------------------------------------------
+# Shared event loop (one per server process)
+# --------------------------------------------------
+# Async LLM clients keep connection pools bound to the loop that created
+# them, so all async work runs on one long-lived loop thread instead of a
+# fresh asyncio.run() per Streamlit rerun.
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def get_event_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_loop.run_forever,
+                name="async-llm-loop",
+                daemon=True
+            ).start()
+        return _loop
+
+
+def run_async(make_coro, on_event=None, poll_interval: float = 0.1):
+    # make_coro(emit) builds the coroutine; anything passed to emit() is
+    # handed to on_event() on the calling (Streamlit script) thread, which
+    # is the only thread allowed to update the UI.
+    events = queue.SimpleQueue()
+    future = asyncio.run_coroutine_threadsafe(
+        make_coro(events.put), get_event_loop()
+    )
+
+    while True:
+        try:
+            event = events.get(timeout=poll_interval)
+        except queue.Empty:
+            if future.done():
+                break
+            continue
+        if on_event:
+            on_event(event)
+
+    while not events.empty():
+        event = events.get()
+        if on_event:
+            on_event(event)
+
+    return future.result()
+
+# --------------------------------------------------
+# Bounded fan-out
+# --------------------------------------------------
+async def gather_bounded(coros, limit: int = LLM_CONCURRENCY, on_done=None):
+    # Like asyncio.gather (results keep input order) but with at most
+    # `limit` coroutines in flight; on_done(done, total) after each one.
+    semaphore = asyncio.Semaphore(limit)
+    total = len(coros)
+    done = 0
+
+    async def run(coro):
+        nonlocal done
+        async with semaphore:
+            result = await coro
+        done += 1
+        if on_done:
+            on_done(done, total)
+        return result
+
+    return await asyncio.gather(*(run(coro) for coro in coros))
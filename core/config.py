@@ -0,0 +1,12 @@
+import os
+from pathlib import Path
+
+# --------------------------------------------------
+# On-disk cache location
+# --------------------------------------------------
+CACHE_DIR = Path(
+    os.getenv(
+        "AI_TUTOR_CACHE_DIR",
+        Path(__file__).resolve().parent.parent / ".cache"
+    )
+)
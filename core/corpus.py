@@ -0,0 +1,282 @@
+import streamlit as st
+
+from core.chunker import Chunker
+from core.extraction import MAX_UPLOAD_MB, oversized_uploads
+from core.index_cache import corpus_key, file_digest, get_index_cache
+from core.index_factory import RECALL_K, VECTOR_COMPRESSION, describe_index
+from core.index_registry import get_index_registry
+from core.models import EMBEDDING_MODEL, get_embeddings
+from core.pipeline import extend_vector_store, ingest_pdfs, remove_files
+
+# --------------------------------------------------
+# Chunk settings (shared by every page)
+# --------------------------------------------------
+# Q&A/Summarizer used a 300-character overlap and the Test Generator 200;
+# one shared corpus needs one setting, and the smaller overlap embeds fewer
+# chunks per book.
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+
+# Per-corpus vector storage: compressed codes trade a little recall (shown
+# after processing) for 2-16x less index memory on large books.
+STORAGE_OPTIONS = {
+    "Full precision (float32)": "none",
+    "Half precision (float16, 2× smaller)": "fp16",
+    "8-bit scalar quantization (4× smaller)": "sq8",
+    "Product quantization (16× smaller)": "pq",
+}
+
+# --------------------------------------------------
+# Session corpus
+# --------------------------------------------------
+# One processed corpus per session, read by the Q&A, Summarizer and Test
+# Generator pages: a book uploaded on any page is ingested and indexed once.
+# The vector stores themselves live in the process-wide index registry; the
+# corpus only holds leases on them, released when the session goes away.
+class Corpus:
+    def __init__(self, key, lease, file_names, file_digests,
+                 compression=VECTOR_COMPRESSION):
+        self.key = key
+        self.file_names = file_names
+        self.file_digests = file_digests
+        self.compression = compression
+        self._lease = lease
+        self._tree_lease = None
+
+    @property
+    def vector_store(self):
+        return self._lease.vector_store
+
+    @property
+    def cached(self) -> bool:
+        return self._lease.cached or self._lease.resident
+
+    @property
+    def shared(self) -> bool:
+        return self._lease.resident
+
+    @property
+    def summary_tree(self):
+        if self._tree_lease is None:
+            return None
+        return self._tree_lease.vector_store
+
+    def attach_summary_tree(self, lease):
+        self._tree_lease = lease
+
+    @property
+    def chunk_count(self) -> int:
+        return self.vector_store.index.ntotal
+
+    def retriever(self, k: int = 4):
+        return self.vector_store.as_retriever(
+            search_type="mmr",
+            search_kwargs={"k": k}
+        )
+
+
+def get_corpus():
+    return st.session_state.get("corpus")
+
+
+def get_chunker():
+    return Chunker(CHUNK_SIZE, CHUNK_OVERLAP)
+
+
+def get_corpus_key(file_digests, compression=VECTOR_COMPRESSION):
+    return corpus_key(
+        file_digests,
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        embedding_model=EMBEDDING_MODEL,
+        compression=compression
+    )
+
+
+def _acquire(key, build):
+    # Registry first (another session may hold it), then the disk cache,
+    # then `build`.
+    return get_index_registry().acquire(
+        key,
+        lambda: get_index_cache().load_or_build(key, get_embeddings(), build)
+    )
+
+
+def _set_corpus(corpus):
+    st.session_state.corpus = corpus
+    return corpus
+
+
+def ingest_uploads(pdf_files, on_progress=None,
+                   compression=VECTOR_COMPRESSION) -> Corpus:
+    embeddings = get_embeddings()
+    digests = [file_digest(pdf_file) for pdf_file in pdf_files]
+    key = get_corpus_key(digests, compression)
+
+    lease = _acquire(
+        key,
+        lambda: ingest_pdfs(
+            pdf_files, embeddings, get_chunker(), on_progress,
+            compression
+        )
+    )
+    return _set_corpus(
+        Corpus(
+            key, lease, [pdf_file.name for pdf_file in pdf_files], digests,
+            compression
+        )
+    )
+
+# --------------------------------------------------
+# Incremental updates
+# --------------------------------------------------
+# Adding or removing files produces a new corpus (and cache key); the old
+# store stays untouched for any other session using it. Only new files are
+# extracted and embedded, and removals never re-embed anything.
+def add_uploads(corpus, pdf_files, on_progress=None) -> Corpus:
+    known = set(corpus.file_digests)
+    new_files, new_digests = [], []
+    for pdf_file in pdf_files:
+        digest = file_digest(pdf_file)
+        if digest not in known:
+            known.add(digest)
+            new_files.append(pdf_file)
+            new_digests.append(digest)
+    if not new_files:
+        return corpus
+
+    embeddings = get_embeddings()
+    digests = corpus.file_digests + new_digests
+    key = get_corpus_key(digests, corpus.compression)
+
+    lease = _acquire(
+        key,
+        lambda: extend_vector_store(
+            corpus.vector_store, new_files, embeddings, get_chunker(),
+            len(corpus.file_digests), on_progress, corpus.compression
+        )
+    )
+    return _set_corpus(
+        Corpus(
+            key,
+            lease,
+            corpus.file_names + [pdf_file.name for pdf_file in new_files],
+            digests,
+            corpus.compression
+        )
+    )
+
+
+def remove_upload(corpus, position: int):
+    digests = corpus.file_digests[:position] + corpus.file_digests[position + 1:]
+    if not digests:
+        st.session_state.pop("corpus", None)
+        return None
+
+    key = get_corpus_key(digests, corpus.compression)
+    lease = _acquire(key, lambda: remove_files(corpus.vector_store, [position]))
+    return _set_corpus(
+        Corpus(
+            key,
+            lease,
+            corpus.file_names[:position] + corpus.file_names[position + 1:],
+            digests,
+            corpus.compression
+        )
+    )
+
+# --------------------------------------------------
+# Shared upload widget
+# --------------------------------------------------
+def _process(ingest):
+    with st.spinner("Processing PDFs..."):
+        progress = st.progress(0.0, text="Extracting pages...")
+
+        def on_progress(pages_done, total_pages, chunks_done):
+            progress.progress(
+                pages_done / max(total_pages, 1),
+                text=f"{pages_done}/{total_pages} pages read, "
+                     f"{chunks_done} chunks embedded"
+            )
+
+        corpus = ingest(on_progress)
+        progress.empty()
+
+    st.success(
+        f"Processed {len(corpus.file_names)} PDF(s) into "
+        f"{corpus.chunk_count} chunks"
+        + (
+            " (shared with another session)" if corpus.shared
+            else " (loaded from cache)" if corpus.cached
+            else ""
+        )
+    )
+    cache_stats = get_embeddings().cache.stats()
+    st.caption(
+        f"Embedding cache hit rate: {cache_stats['hit_rate']:.0%} "
+        f"({cache_stats['hits']} hits, {cache_stats['misses']} misses)"
+    )
+    index = corpus.vector_store.index
+    st.caption(f"Search index: {describe_index(index)}")
+    report = getattr(index, "report", None)
+    if report:
+        st.caption(
+            f"Recall@{RECALL_K} vs exact search: {report['recall']:.1%} with "
+            f"re-ranking ({report['codes_recall']:.1%} from codes "
+            f"alone) · {report['compression_ratio']:.1f}× less index "
+            "memory"
+        )
+
+
+def _manage_files(corpus):
+    with st.expander("Manage processed PDFs"):
+        for position, name in enumerate(corpus.file_names):
+            name_col, button_col = st.columns([4, 1])
+            name_col.write(name)
+            if button_col.button("Remove", key=f"remove-{corpus.key}-{position}"):
+                with st.spinner(f"Removing {name}..."):
+                    remove_upload(corpus, position)
+                st.rerun()
+
+
+def corpus_uploader(uploader_label: str, button_label: str):
+    corpus = get_corpus()
+    if corpus is not None:
+        st.info(
+            f"📚 Using {len(corpus.file_names)} processed PDF(s) "
+            f"({corpus.chunk_count} chunks): {', '.join(corpus.file_names)}. "
+            "Upload more files below to add them or replace the current ones."
+        )
+        _manage_files(corpus)
+
+    pdf_files = st.file_uploader(
+        uploader_label,
+        accept_multiple_files=True,
+        type=["pdf"]
+    )
+    too_large = oversized_uploads(pdf_files or [])
+    if too_large:
+        st.error(
+            f"Skipping files over {MAX_UPLOAD_MB} MB: "
+            f"{', '.join(pdf_file.name for pdf_file in too_large)}"
+        )
+        pdf_files = [pdf_file for pdf_file in pdf_files if pdf_file not in too_large]
+    storage = st.selectbox(
+        "Vector storage",
+        list(STORAGE_OPTIONS),
+        index=list(STORAGE_OPTIONS.values()).index(VECTOR_COMPRESSION)
+    )
+
+    if pdf_files and st.button(button_label):
+        _process(
+            lambda on_progress: ingest_uploads(
+                pdf_files, on_progress, STORAGE_OPTIONS[storage]
+            )
+        )
+
+    if pdf_files and corpus is not None and st.button("➕ Add to processed PDFs"):
+        _process(
+            lambda on_progress: add_uploads(corpus, pdf_files, on_progress)
+        )
+
+    return get_corpus()
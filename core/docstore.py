@@ -0,0 +1,235 @@
+from array import array
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_core.documents import Document
+
+# --------------------------------------------------
+# Chunk records
+# --------------------------------------------------
+# One chunk as produced by ingestion: its text plus where it starts (file,
+# 0-based page and character offset within that page).
+Chunk = namedtuple("Chunk", ["text", "file_index", "page", "start"])
+
+TEXT_FILE = "text.npy"
+ARRAY_FILES = {
+    "offsets": "offsets.npy",
+    "file_index": "file_index.npy",
+    "page": "page.npy",
+    "start": "start.npy",
+}
+ARRAY_TYPES = {"offsets": "q", "file_index": "i", "page": "i", "start": "q"}
+
+# --------------------------------------------------
+# Row ids
+# --------------------------------------------------
+class RowIds:
+    # Stands in for FAISS.index_to_docstore_id: docstore ids are the FAISS
+    # row numbers themselves, so the mapping is the identity and only its
+    # length is stored.
+    def __init__(self, size: int = 0):
+        self._size = size
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, row) -> int:
+        row = int(row)
+        if not 0 <= row < self._size:
+            raise KeyError(row)
+        return row
+
+    def __contains__(self, row) -> bool:
+        return 0 <= int(row) < self._size
+
+    def __iter__(self):
+        return iter(range(self._size))
+
+    def keys(self):
+        return range(self._size)
+
+    def values(self):
+        return range(self._size)
+
+    def items(self):
+        return ((row, row) for row in range(self._size))
+
+    def get(self, row, default=None):
+        return self[row] if row in self else default
+
+    def update(self, mapping):
+        for row, doc_id in sorted(dict(mapping).items()):
+            if row != self._size or int(doc_id) != row:
+                raise ValueError(
+                    "Compact docstore ids must equal their FAISS row numbers"
+                )
+            self._size += 1
+
+    def extend(self, count: int):
+        self._size += count
+
+# --------------------------------------------------
+# Compact docstore
+# --------------------------------------------------
+class CompactDocstore(Docstore, AddableMixin):
+    # All chunk texts live in one UTF-8 buffer sliced by an offsets array;
+    # file, page and start metadata sit in parallel integer arrays. Documents
+    # are only materialized for the rows a search actually returns. Loaded
+    # stores memory-map every array and copy them in only if they grow.
+    def __init__(self):
+        self._text = bytearray()
+        self._arrays = {name: array(code) for name, code in ARRAY_TYPES.items()}
+        self._arrays["offsets"].append(0)
+        self._mapped = False
+
+    def __len__(self) -> int:
+        return len(self._arrays["offsets"]) - 1
+
+    @property
+    def nbytes(self) -> int:
+        # Memory-mapped buffers live in the shared page cache.
+        if self._mapped:
+            return 0
+        return len(self._text) + sum(
+            len(values) * values.itemsize for values in self._arrays.values()
+        )
+
+    # ---------- reading ----------
+    def text_bytes(self, row: int) -> memoryview:
+        offsets = self._arrays["offsets"]
+        return memoryview(self._text)[offsets[row]:offsets[row + 1]]
+
+    def text(self, row: int) -> str:
+        return str(self.text_bytes(row), "utf-8")
+
+    def metadata(self, row: int) -> dict:
+        return {
+            "file_index": int(self._arrays["file_index"][row]),
+            "page": int(self._arrays["page"][row]),
+            "start_index": int(self._arrays["start"][row]),
+        }
+
+    def search(self, search: str):
+        try:
+            row = int(search)
+        except (TypeError, ValueError):
+            return f"ID {search} not found."
+        if not 0 <= row < len(self):
+            return f"ID {search} not found."
+        return Document(
+            id=str(row), page_content=self.text(row), metadata=self.metadata(row)
+        )
+
+    # ---------- writing ----------
+    def _ensure_writable(self):
+        if not self._mapped:
+            return
+        copied = self.copy()
+        self._text, self._arrays = copied._text, copied._arrays
+        self._mapped = False
+
+    def extend(self, chunks):
+        self._ensure_writable()
+        offsets = self._arrays["offsets"]
+        for chunk in chunks:
+            self._text += chunk.text.encode("utf-8")
+            offsets.append(len(self._text))
+            self._arrays["file_index"].append(chunk.file_index)
+            self._arrays["page"].append(chunk.page)
+            self._arrays["start"].append(chunk.start)
+
+    def add(self, texts: dict):
+        # LangChain's FAISS.add_* path: ids must continue the row sequence.
+        try:
+            rows = sorted(int(doc_id) for doc_id in texts)
+        except ValueError:
+            rows = None
+        if rows != list(range(len(self), len(self) + len(texts))):
+            raise ValueError(
+                "Compact docstore ids must equal their FAISS row numbers"
+            )
+        chunks = []
+        for row in rows:
+            doc = texts[row] if row in texts else texts[str(row)]
+            chunks.append(
+                Chunk(
+                    doc.page_content,
+                    doc.metadata.get("file_index", 0),
+                    doc.metadata.get("page", 0),
+                    doc.metadata.get("start_index", 0),
+                )
+            )
+        self.extend(chunks)
+
+    def delete(self, ids):
+        # Rows are FAISS row numbers: dropping some renumbers every later row,
+        # which FAISS.delete's id remapping cannot follow. Whole files are
+        # removed with core.pipeline.remove_files, which rebuilds the index
+        # and docstore together (via without_files).
+        raise ValueError(
+            "Compact docstore rows cannot be deleted individually; use "
+            "core.pipeline.remove_files to remove a file's chunks"
+        )
+
+    def copy(self):
+        docstore = type(self)()
+        docstore._text = bytearray(self._text)
+        docstore._arrays = {
+            name: array(ARRAY_TYPES[name], np.asarray(values).tolist())
+            for name, values in self._arrays.items()
+        }
+        return docstore
+
+    def file_indices(self) -> np.ndarray:
+        return np.asarray(self._arrays["file_index"], dtype=np.int64)
+
+    def without_files(self, file_indices):
+        # A new docstore without the given files' rows, later files renumbered
+        # to close the gap, plus the removed row numbers.
+        removed_files = np.unique(np.asarray(list(file_indices), dtype=np.int64))
+        files = self.file_indices()
+        removed = np.flatnonzero(np.isin(files, removed_files))
+        kept = np.flatnonzero(~np.isin(files, removed_files))
+
+        offsets = np.asarray(self._arrays["offsets"], dtype=np.int64)
+        text = np.frombuffer(self._text, dtype=np.uint8)
+        docstore = type(self)()
+        docstore._text = bytearray().join(
+            text[offsets[row]:offsets[row + 1]] for row in kept
+        )
+        docstore._arrays["offsets"].extend(
+            np.cumsum(offsets[kept + 1] - offsets[kept]).tolist()
+        )
+        docstore._arrays["file_index"].extend(
+            (files[kept] - np.searchsorted(removed_files, files[kept])).tolist()
+        )
+        for name in ("page", "start"):
+            docstore._arrays[name].extend(
+                np.asarray(self._arrays[name])[kept].tolist()
+            )
+        return docstore, removed
+
+    # ---------- persistence ----------
+    def save(self, directory: Path):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / TEXT_FILE, np.frombuffer(self._text, dtype=np.uint8))
+        for name, file_name in ARRAY_FILES.items():
+            np.save(
+                directory / file_name,
+                np.asarray(self._arrays[name], dtype=ARRAY_TYPES[name])
+            )
+
+    @classmethod
+    def load(cls, directory: Path):
+        directory = Path(directory)
+        docstore = cls.__new__(cls)
+        docstore._text = np.load(directory / TEXT_FILE, mmap_mode="r")
+        docstore._arrays = {
+            name: np.load(directory / file_name, mmap_mode="r")
+            for name, file_name in ARRAY_FILES.items()
+        }
+        docstore._mapped = True
+        return docstore
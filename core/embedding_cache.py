@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from core.config import CACHE_DIR
+
+# --------------------------------------------------
+# Settings
+# --------------------------------------------------
+EMBEDDING_CACHE_DIR = CACHE_DIR / "embeddings"
+
+KEYS_FILE = "keys.bin"
+VECTORS_FILE = "vectors.f32"
+META_FILE = "meta.json"
+
+DIGEST_SIZE = hashlib.sha1().digest_size
+
+# --------------------------------------------------
+# Chunk embedding cache
+# --------------------------------------------------
+# Layout: vectors.f32 is a flat float32 array (one row per chunk) that is
+# memory-mapped for reads, and keys.bin holds the matching SHA-1 digests of
+# (model, text) in the same row order. Vectors are always appended before
+# their keys, so a crash can only leave unreferenced rows behind.
+class EmbeddingCache:
+    def __init__(self, model_name: str, root: Path = EMBEDDING_CACHE_DIR):
+        slug = hashlib.sha1(model_name.encode()).hexdigest()[:16]
+        self.model_name = model_name
+        self.path = Path(root) / slug
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._rows = {}
+        self._dim = None
+        self._vectors = None
+        self._load()
+
+    def _load(self):
+        meta = self.path / META_FILE
+        if not meta.exists():
+            return
+        self._dim = json.loads(meta.read_text())["dim"]
+
+        keys_path = self.path / KEYS_FILE
+        vectors_path = self.path / VECTORS_FILE
+        keys = keys_path.read_bytes() if keys_path.exists() else b""
+        vector_bytes = os.path.getsize(vectors_path) if vectors_path.exists() else 0
+        rows = min(len(keys) // DIGEST_SIZE, vector_bytes // (self._dim * 4))
+
+        # Drop any partially written tail so new rows stay aligned.
+        if vectors_path.exists():
+            os.truncate(vectors_path, rows * self._dim * 4)
+        if keys_path.exists():
+            os.truncate(keys_path, rows * DIGEST_SIZE)
+
+        for row in range(rows):
+            self._rows[keys[row * DIGEST_SIZE:(row + 1) * DIGEST_SIZE]] = row
+
+    def _key(self, text: str) -> bytes:
+        return hashlib.sha1(
+            self.model_name.encode() + b"\0" + text.encode()
+        ).digest()
+
+    def _mapped_vectors(self):
+        if self._vectors is None or len(self._vectors) < len(self._rows):
+            self._vectors = np.memmap(
+                self.path / VECTORS_FILE,
+                dtype=np.float32,
+                mode="r",
+                shape=(len(self._rows), self._dim)
+            )
+        return self._vectors
+
+    def get_many(self, texts):
+        keys = [self._key(text) for text in texts]
+        with self._lock:
+            found = [self._rows.get(key) for key in keys]
+            hits = [row for row in found if row is not None]
+            self.hits += len(hits)
+            self.misses += len(found) - len(hits)
+            if not hits:
+                return [None] * len(texts)
+
+            vectors = self._mapped_vectors()
+            return [
+                None if row is None else vectors[row].tolist()
+                for row in found
+            ]
+
+    def put_many(self, texts, vectors):
+        with self._lock:
+            new = {}
+            for text, vector in zip(texts, vectors):
+                key = self._key(text)
+                if key not in self._rows and key not in new:
+                    new[key] = vector
+            if not new:
+                return
+
+            block = np.asarray(list(new.values()), dtype=np.float32)
+            if self._dim is None:
+                self._dim = block.shape[1]
+                (self.path / META_FILE).write_text(json.dumps({"dim": self._dim}))
+
+            with open(self.path / VECTORS_FILE, "ab") as f:
+                f.write(block.tobytes())
+            with open(self.path / KEYS_FILE, "ab") as f:
+                f.write(b"".join(new))
+
+            for key in new:
+                self._rows[key] = len(self._rows)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._rows),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+# --------------------------------------------------
+# Embeddings wrapper
+# --------------------------------------------------
+class CachedEmbeddings(Embeddings):
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache):
+        self.embeddings = embeddings
+        self.cache = cache
+
+    def embed_documents(self, texts):
+        # Identical chunks (overlaps, shared boilerplate, the same PDF from
+        # another page or session) are embedded at most once.
+        unique = list(dict.fromkeys(texts))
+        cached = dict(zip(unique, self.cache.get_many(unique)))
+
+        missing = [text for text in unique if cached[text] is None]
+        if missing:
+            vectors = self.embeddings.embed_documents(missing)
+            self.cache.put_many(missing, vectors)
+            cached.update(zip(missing, vectors))
+
+        return [cached[text] for text in texts]
+
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
+
+
+def uncached(embeddings: Embeddings) -> Embeddings:
+    # The underlying model, for one-off texts (search queries, generated
+    # questions) that should not be persisted in the chunk embedding cache.
+    if isinstance(embeddings, CachedEmbeddings):
+        return embeddings.embeddings
+    return embeddings
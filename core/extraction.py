@@ -0,0 +1,181 @@
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from PyPDF2 import PdfReader
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------------------------
+# Settings
+# --------------------------------------------------
+PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "20"))
+EXTRACTION_WORKERS = int(
+    os.getenv("PDF_EXTRACTION_WORKERS", str(os.cpu_count() or 1))
+)
+# Page-range tasks submitted ahead of the one being consumed; extracted text
+# waiting to be chunked is bounded by this many tasks' pages.
+MAX_TASKS_IN_FLIGHT = int(
+    os.getenv("PDF_MAX_TASKS_IN_FLIGHT", str(2 * EXTRACTION_WORKERS))
+)
+
+# Per-file upload limit. Keep in step with server.maxUploadSize in
+# .streamlit/config.toml, which rejects larger files before they upload.
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "200"))
+MAX_UPLOAD_BYTES = MAX_UPLOAD_MB * 1024 ** 2
+
+SPILL_CHUNK_BYTES = 1024 ** 2
+
+PageText = namedtuple(
+    "PageText", ["file_index", "page_number", "text", "seconds"]
+)
+
+# --------------------------------------------------
+# Worker
+# --------------------------------------------------
+def _resolve(value):
+    # PDF dictionaries return indirect references ("5 0 R") from .get()
+    # unresolved; follow them to the actual object.
+    return value.get_object() if value is not None else None
+
+
+def _has_fonts(resources, depth: int = 0) -> bool:
+    # Text can only be drawn with a font, so a page whose resources (and
+    # form XObjects) declare none is a scanned image: skip parsing its
+    # content stream altogether.
+    resources = _resolve(resources)
+    if not resources:
+        return False
+    if _resolve(resources.get("/Font")):
+        return True
+    if depth >= 2:
+        return False
+    for xobject in (_resolve(resources.get("/XObject")) or {}).values():
+        xobject = _resolve(xobject)
+        if xobject.get("/Subtype") == "/Form" and _has_fonts(
+            xobject.get("/Resources"), depth + 1
+        ):
+            return True
+    return False
+
+
+def _may_have_text(page) -> bool:
+    try:
+        return _has_fonts(page.get("/Resources"))
+    except Exception:
+        # A resource tree this check cannot follow: let extract_text decide.
+        return True
+
+
+def _extract_page_range(file_index, path, start, end):
+    # Workers open the spilled file themselves, so only its path crosses the
+    # process boundary instead of a copy of the whole PDF per task.
+    reader = PdfReader(path)
+    pages = []
+    for page_number in range(start, end):
+        started = time.perf_counter()
+        page = reader.pages[page_number]
+        text = ""
+        if _may_have_text(page):
+            text = page.extract_text() or ""
+        pages.append(
+            PageText(
+                file_index,
+                page_number,
+                text,
+                time.perf_counter() - started
+            )
+        )
+    return pages
+
+# --------------------------------------------------
+# Process pool (one per server process)
+# --------------------------------------------------
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_extraction_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # "spawn" avoids forking the multi-threaded Streamlit server.
+            _pool = ProcessPoolExecutor(
+                max_workers=EXTRACTION_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+# --------------------------------------------------
+# Uploads
+# --------------------------------------------------
+def oversized_uploads(pdf_files):
+    return [pdf_file for pdf_file in pdf_files if pdf_file.size > MAX_UPLOAD_BYTES]
+
+
+def spill_upload(pdf_file, path) -> Path:
+    # Streams the upload to a temporary file in fixed-size blocks, without
+    # another in-memory copy of it.
+    path = Path(path)
+    pdf_file.seek(0)
+    with open(path, "wb") as out:
+        shutil.copyfileobj(pdf_file, out, SPILL_CHUNK_BYTES)
+    pdf_file.seek(0)
+    return path
+
+# --------------------------------------------------
+# Extraction
+# --------------------------------------------------
+def _page_tasks(paths):
+    for file_index, path in enumerate(paths):
+        with open(path, "rb") as stream:
+            page_count = len(PdfReader(stream).pages)
+        for start in range(0, page_count, PAGES_PER_TASK):
+            yield file_index, path, start, min(start + PAGES_PER_TASK, page_count)
+
+
+def iter_pages(pdf_files):
+    # Fan out over (file, page range) tasks, then yield pages back in
+    # submission order so the output is identical to a serial walk. At most
+    # MAX_TASKS_IN_FLIGHT tasks are outstanding, so memory stays bounded
+    # however many pages the uploads have.
+    pool = get_extraction_pool()
+    pending = deque()
+
+    with tempfile.TemporaryDirectory(prefix="ai-tutor-") as directory:
+        paths = [
+            spill_upload(pdf_file, Path(directory) / f"{file_index}.pdf")
+            for file_index, pdf_file in enumerate(pdf_files)
+        ]
+        tasks = _page_tasks(paths)
+        try:
+            for task in tasks:
+                pending.append(pool.submit(_extract_page_range, *task))
+                if len(pending) >= MAX_TASKS_IN_FLIGHT:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            # Abandoned early (cancelled ingestion): drop queued tasks.
+            for future in pending:
+                future.cancel()
+
+
+def timing_report(page_count: int, total: float, slowest) -> str:
+    # slowest: the PageText that took longest to extract.
+    if not page_count:
+        return "Extracted 0 pages"
+
+    return (
+        f"Extracted {page_count} pages in {total:.2f}s of worker time "
+        f"({total / page_count * 1000:.1f} ms/page, slowest: file "
+        f"{slowest.file_index} page {slowest.page_number + 1} "
+        f"at {slowest.seconds * 1000:.1f} ms)"
+    )
@@ -0,0 +1,208 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import threading
+from pathlib import Path
+from uuid import uuid4
+
+import faiss
+import numpy as np
+import streamlit as st
+from langchain_community.vectorstores import FAISS
+
+from core.config import CACHE_DIR
+from core.docstore import CompactDocstore, RowIds
+from core.index_factory import RerankIndex, configure_search
+
+# --------------------------------------------------
+# Settings
+# --------------------------------------------------
+INDEX_CACHE_DIR = CACHE_DIR / "indexes"
+INDEX_CACHE_MAX_BYTES = int(
+    os.getenv("INDEX_CACHE_MAX_BYTES", str(2 * 1024 ** 3))
+)
+
+# Bump when the on-disk layout (or how chunks are cut) changes so stale
+# entries are never read.
+CACHE_FORMAT = 5
+
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "docstore.pkl"
+# Compact docstores are saved as memory-mappable arrays instead of a pickle.
+DOCSTORE_DIR = "docstore"
+# Compressed indexes also keep their exact float32 vectors for re-ranking.
+VECTORS_FILE = "vectors.npy"
+META_FILE = "meta.json"
+
+# --------------------------------------------------
+# Cache keys
+# --------------------------------------------------
+def file_digest(uploaded_file) -> str:
+    # Hashed in blocks rather than via getvalue(), which copies the upload.
+    digest = hashlib.sha256()
+    uploaded_file.seek(0)
+    for block in iter(lambda: uploaded_file.read(1024 ** 2), b""):
+        digest.update(block)
+    uploaded_file.seek(0)
+    return digest.hexdigest()
+
+
+def corpus_key(file_digests, **settings) -> str:
+    # Content-addressed: the same PDFs processed with the same chunking and
+    # embedding settings always map to the same entry.
+    digest = hashlib.sha256(f"format={CACHE_FORMAT}".encode())
+    for file_hash in file_digests:
+        digest.update(file_hash.encode())
+    for name in sorted(settings):
+        digest.update(f"|{name}={settings[name]}".encode())
+    return digest.hexdigest()
+
+# --------------------------------------------------
+# Index serialization
+# --------------------------------------------------
+def _read_index(path: Path):
+    # Memory-map the index so loading is O(1) and pages are shared through
+    # the OS page cache; fall back to a plain read for index types faiss
+    # cannot map.
+    mmap_flag = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+    try:
+        index = faiss.read_index(str(path), mmap_flag | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        index = faiss.read_index(str(path))
+    return configure_search(index)
+
+
+def _read_rerank_index(entry: Path):
+    with open(entry / META_FILE) as f:
+        meta = json.load(f)
+    vectors = np.load(entry / VECTORS_FILE, mmap_mode="r")
+    index = RerankIndex(
+        _read_index(entry / INDEX_FILE), vectors, meta["compression"],
+        read_only=True
+    )
+    index.report = meta.get("report", {})
+    return index
+
+
+def _write_index(index, entry: Path):
+    if not isinstance(index, RerankIndex):
+        faiss.write_index(index, str(entry / INDEX_FILE))
+        return
+
+    faiss.write_index(index.index, str(entry / INDEX_FILE))
+    np.save(entry / VECTORS_FILE, np.asarray(index.vectors, dtype=np.float32))
+    with open(entry / META_FILE, "w") as f:
+        json.dump({"compression": index.compression, "report": index.report}, f)
+
+
+def _dir_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+# --------------------------------------------------
+# Persistent FAISS index cache
+# --------------------------------------------------
+class IndexCache:
+    def __init__(self, root: Path = INDEX_CACHE_DIR, max_bytes: int = INDEX_CACHE_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _entry(self, key: str) -> Path:
+        return self.root / key
+
+    def load(self, key: str, embeddings):
+        entry = self._entry(key)
+        if not (entry / INDEX_FILE).exists():
+            return None
+
+        try:
+            if (entry / VECTORS_FILE).exists():
+                index = _read_rerank_index(entry)
+            else:
+                index = _read_index(entry / INDEX_FILE)
+            if (entry / DOCSTORE_DIR).is_dir():
+                docstore = CompactDocstore.load(entry / DOCSTORE_DIR)
+                index_to_docstore_id = RowIds(len(docstore))
+            else:
+                with open(entry / DOCSTORE_FILE, "rb") as f:
+                    docstore, index_to_docstore_id = pickle.load(f)
+        except (
+            OSError, RuntimeError, ValueError, KeyError,
+            pickle.UnpicklingError, EOFError
+        ):
+            shutil.rmtree(entry, ignore_errors=True)
+            return None
+
+        # The directory mtime doubles as the LRU timestamp.
+        os.utime(entry)
+
+        return FAISS(
+            embedding_function=embeddings,
+            index=index,
+            docstore=docstore,
+            index_to_docstore_id=index_to_docstore_id
+        )
+
+    def save(self, key: str, vector_store):
+        entry = self._entry(key)
+        tmp = self.root / f".tmp-{uuid4().hex}"
+        tmp.mkdir()
+
+        try:
+            _write_index(vector_store.index, tmp)
+            if isinstance(vector_store.docstore, CompactDocstore):
+                vector_store.docstore.save(tmp / DOCSTORE_DIR)
+            else:
+                with open(tmp / DOCSTORE_FILE, "wb") as f:
+                    pickle.dump(
+                        (vector_store.docstore, vector_store.index_to_docstore_id),
+                        f,
+                        protocol=pickle.HIGHEST_PROTOCOL
+                    )
+
+            with self._lock:
+                if entry.exists():
+                    shutil.rmtree(tmp, ignore_errors=True)
+                else:
+                    os.replace(tmp, entry)
+                self._evict()
+        except Exception:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+    def load_or_build(self, key: str, embeddings, build):
+        vector_store = self.load(key, embeddings)
+        if vector_store is not None:
+            return vector_store, True
+
+        vector_store = build()
+        self.save(key, vector_store)
+        if isinstance(vector_store.index, RerankIndex) or isinstance(
+            vector_store.docstore, CompactDocstore
+        ):
+            # Reload so re-ranking vectors and chunk text are memory-mapped
+            # instead of held in this process's heap.
+            vector_store = self.load(key, embeddings) or vector_store
+        return vector_store, False
+
+    def _evict(self):
+        entries = [
+            (path.stat().st_mtime, _dir_size(path), path)
+            for path in self.root.iterdir()
+            if path.is_dir() and not path.name.startswith(".tmp-")
+        ]
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+
+@st.cache_resource
+def get_index_cache():
+    return IndexCache()
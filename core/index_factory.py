@@ -0,0 +1,334 @@
+import logging
+import math
+import os
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------------------------
+# Settings
+# --------------------------------------------------
+# Below FLAT_MAX_VECTORS a brute-force scan is both exact and fast enough;
+# HNSW covers the middle range without training, IVF the very large corpora.
+FLAT_MAX_VECTORS = int(os.getenv("FLAT_MAX_VECTORS", "20000"))
+HNSW_MAX_VECTORS = int(os.getenv("HNSW_MAX_VECTORS", "500000"))
+
+HNSW_M = int(os.getenv("HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "80"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "16"))
+IVF_TRAIN_POINTS_PER_LIST = 64
+
+RECALL_QUERIES = 200
+RECALL_K = 10
+
+# Compressed storage keeps only quantized codes in the index and re-ranks
+# RERANK_FACTOR * k candidates against the exact float32 vectors, which stay
+# on disk and are memory-mapped. "pq" stores one byte per PQ_DIMS_PER_CODE
+# dimensions (16x smaller at 4) and needs enough vectors to train its
+# codebooks; smaller corpora fall back to "sq8".
+COMPRESSIONS = ("none", "fp16", "sq8", "pq")
+VECTOR_COMPRESSION = os.getenv("VECTOR_COMPRESSION", "none")
+RERANK_FACTOR = int(os.getenv("RERANK_FACTOR", "4"))
+PQ_DIMS_PER_CODE = 4
+PQ_MIN_TRAIN_POINTS = 1024
+CODEC_TRAIN_POINTS = 10000
+
+SCALAR_QUANTIZERS = {
+    "fp16": faiss.ScalarQuantizer.QT_fp16,
+    "sq8": faiss.ScalarQuantizer.QT_8bit,
+}
+
+# --------------------------------------------------
+# Index selection
+# --------------------------------------------------
+def choose_index_type(n_vectors: int) -> str:
+    if n_vectors <= FLAT_MAX_VECTORS:
+        return "flat"
+    if n_vectors <= HNSW_MAX_VECTORS:
+        return "hnsw"
+    return "ivf"
+
+
+def configure_search(index):
+    # Search-time knobs are re-applied after loading so env changes take
+    # effect on cached indexes too.
+    if isinstance(index, RerankIndex):
+        configure_search(index.index)
+    elif isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+    elif isinstance(index, faiss.IndexIVF):
+        index.nprobe = IVF_NPROBE
+    return index
+
+
+def writable_copy(index):
+    # Indexes read with IO_FLAG_MMAP_IFC only view the file; faiss aborts on
+    # any write to them (clone_index keeps the view), so round-trip through
+    # an in-memory buffer before mutating.
+    return configure_search(
+        faiss.deserialize_index(faiss.serialize_index(index))
+    )
+
+
+def _pq_subquantizers(dim: int) -> int:
+    # PQ needs the dimension to split evenly into sub-vectors.
+    m = max(1, dim // PQ_DIMS_PER_CODE)
+    while dim % m:
+        m -= 1
+    return m
+
+
+def choose_compression(n_vectors: int, compression: str) -> str:
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression: {compression}")
+    if n_vectors == 0:
+        # No text was extracted (e.g. a scanned PDF): nothing to train a
+        # codec on, and an empty flat index costs nothing.
+        return "none"
+    if compression == "pq" and n_vectors < PQ_MIN_TRAIN_POINTS:
+        return "sq8"
+    return compression
+
+
+def build_index(vectors: np.ndarray, index_type: str = None, compression: str = "none"):
+    n_vectors, dim = vectors.shape
+    index_type = index_type or choose_index_type(n_vectors)
+    compression = choose_compression(n_vectors, compression)
+    qtype = SCALAR_QUANTIZERS.get(compression)
+    train_size = CODEC_TRAIN_POINTS
+
+    if index_type == "flat":
+        if compression == "none":
+            index = faiss.IndexFlatL2(dim)
+        elif compression == "pq":
+            index = faiss.IndexPQ(dim, _pq_subquantizers(dim), 8)
+        else:
+            index = faiss.IndexScalarQuantizer(dim, qtype, faiss.METRIC_L2)
+
+    elif index_type == "hnsw":
+        if compression == "none":
+            index = faiss.IndexHNSWFlat(dim, HNSW_M)
+        elif compression == "pq":
+            index = faiss.IndexHNSWPQ(dim, _pq_subquantizers(dim), HNSW_M)
+        else:
+            index = faiss.IndexHNSWSQ(dim, qtype, HNSW_M)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+
+    elif index_type == "ivf":
+        nlist = max(1, int(4 * math.sqrt(n_vectors)))
+        quantizer = faiss.IndexFlatL2(dim)
+        if compression == "none":
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+        elif compression == "pq":
+            index = faiss.IndexIVFPQ(
+                quantizer, dim, nlist, _pq_subquantizers(dim), 8
+            )
+        else:
+            index = faiss.IndexIVFScalarQuantizer(quantizer, dim, nlist, qtype)
+        train_size = nlist * IVF_TRAIN_POINTS_PER_LIST
+        if compression != "none":
+            train_size = max(train_size, CODEC_TRAIN_POINTS)
+
+    else:
+        raise ValueError(f"Unknown index type: {index_type}")
+
+    if not index.is_trained:
+        sample_size = min(n_vectors, train_size)
+        sample = np.random.default_rng(0).choice(
+            n_vectors, sample_size, replace=False
+        )
+        index.train(vectors[np.sort(sample)])
+
+    index.add(vectors)
+
+    if isinstance(index, faiss.IndexIVF):
+        # MMR re-ranking reconstructs candidate vectors by id.
+        index.make_direct_map()
+
+    index = configure_search(index)
+    if compression != "none":
+        index = RerankIndex(index, vectors, compression)
+    return index
+
+# --------------------------------------------------
+# Compressed index with exact re-ranking
+# --------------------------------------------------
+class RerankIndex:
+    # Quantized codes find RERANK_FACTOR * k candidates cheaply; exact
+    # distances against the float32 vectors (usually a read-only memmap)
+    # pick the final k. Exposes the subset of the faiss.Index API that the
+    # LangChain FAISS store and this package use.
+    def __init__(self, index, vectors, compression: str,
+                 rerank_factor: int = RERANK_FACTOR, read_only: bool = False):
+        self.index = index
+        self.vectors = vectors
+        self.compression = compression
+        self.rerank_factor = rerank_factor
+        self.read_only = read_only
+        self.report = {}
+
+    @property
+    def ntotal(self) -> int:
+        return self.index.ntotal
+
+    @property
+    def d(self) -> int:
+        return self.index.d
+
+    @property
+    def metric_type(self):
+        return self.index.metric_type
+
+    def search(self, x, k: int):
+        x = np.ascontiguousarray(x, dtype=np.float32)
+        n_candidates = max(k, min(k * self.rerank_factor, self.ntotal))
+        _, candidates = self.index.search(x, n_candidates)
+
+        rows = np.where(candidates < 0, 0, candidates)
+        exact = np.asarray(self.vectors[rows.ravel()], dtype=np.float32)
+        exact = exact.reshape(*rows.shape, self.d)
+        distances = ((exact - x[:, None, :]) ** 2).sum(axis=2)
+        distances[candidates < 0] = np.finfo(np.float32).max
+
+        order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+        return (
+            np.take_along_axis(distances, order, axis=1).astype(np.float32),
+            np.take_along_axis(candidates, order, axis=1),
+        )
+
+    def reconstruct(self, i: int):
+        return np.array(self.vectors[i], dtype=np.float32)
+
+    def reconstruct_n(self, i0: int, n: int):
+        return np.array(self.vectors[i0:i0 + n], dtype=np.float32)
+
+    def add(self, x):
+        x = np.ascontiguousarray(x, dtype=np.float32)
+        if self.read_only:
+            # Memory-mapped codes cannot grow; copy them into memory first.
+            self.index = writable_copy(self.index)
+            self.read_only = False
+        self.index.add(x)
+        # A memmap cannot grow; new vectors move the set into memory until
+        # the store is saved and memory-mapped again.
+        self.vectors = np.concatenate([np.asarray(self.vectors), x])
+
+    def remove_ids(self, ids):
+        # Raises RuntimeError, untouched, where the codes index cannot
+        # remove (HNSW); otherwise rows shift down exactly as in faiss.
+        ids = np.asarray(ids, dtype=np.int64)
+        if self.read_only:
+            self.index = writable_copy(self.index)
+            self.read_only = False
+        removed = self.index.remove_ids(ids)
+        self.vectors = np.delete(np.asarray(self.vectors), ids, axis=0)
+        return removed
+
+# --------------------------------------------------
+# Recall measurement
+# --------------------------------------------------
+def measure_recall(index, vectors: np.ndarray, k: int = RECALL_K) -> float:
+    n_vectors = len(vectors)
+    if n_vectors == 0:
+        return 1.0
+
+    # Midpoints of random pairs make realistic off-manifold queries without
+    # the trivial self-match of querying stored vectors directly.
+    rng = np.random.default_rng(0)
+    pairs = rng.integers(0, n_vectors, size=(RECALL_QUERIES, 2))
+    queries = ((vectors[pairs[:, 0]] + vectors[pairs[:, 1]]) / 2).astype(np.float32)
+
+    k = min(k, n_vectors)
+    baseline = faiss.IndexFlatL2(vectors.shape[1])
+    baseline.add(vectors)
+    _, expected = baseline.search(queries, k)
+    _, found = index.search(queries, k)
+
+    hits = sum(
+        len(set(e) & set(f)) for e, f in zip(expected.tolist(), found.tolist())
+    )
+    return hits / (len(queries) * k)
+
+
+def describe_index(index) -> str:
+    if isinstance(index, RerankIndex):
+        search = describe_index(index.index)
+        if search.startswith("Flat"):
+            search = "Flat scan"
+        return (
+            f"{search} over {index.compression.upper()} codes, "
+            f"exact re-rank of top {index.rerank_factor}×k"
+        )
+    if isinstance(index, faiss.IndexHNSW):
+        return f"HNSW (M={index.hnsw.nb_neighbors(1)}, efSearch={index.hnsw.efSearch})"
+    if isinstance(index, faiss.IndexIVF):
+        return f"IVF (nlist={index.nlist}, nprobe={index.nprobe})"
+    return "Flat (exact)"
+
+
+def index_memory_bytes(index) -> int:
+    # Approximate resident size: the stored vector codes plus each index
+    # type's graph, id or inverted-list overhead. Memory-mapped re-ranking
+    # vectors live in the shared page cache and are not counted.
+    if isinstance(index, RerankIndex):
+        vectors = 0 if isinstance(index.vectors, np.memmap) else index.vectors.nbytes
+        return index_memory_bytes(index.index) + vectors
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        hnsw = index.hnsw
+        return (
+            index_memory_bytes(index.storage)
+            + hnsw.neighbors.size() * 4
+            + hnsw.levels.size() * 4
+            + hnsw.offsets.size() * 8
+        )
+    if isinstance(index, faiss.IndexIVF):
+        return (
+            index_memory_bytes(index.quantizer)
+            + index.ntotal * (index.code_size + 8)
+        )
+    if isinstance(index, faiss.IndexIDMap):
+        return index_memory_bytes(index.index) + index.ntotal * 8
+    return index.ntotal * index.sa_code_size()
+
+# --------------------------------------------------
+# Vector store integration
+# --------------------------------------------------
+def optimize_index(vector_store, compression: str = VECTOR_COMPRESSION):
+    # Ingestion streams into a flat index; once the final size is known,
+    # swap in the index type (and storage codec) that suits it.
+    index = vector_store.index
+    n_vectors = index.ntotal
+    index_type = choose_index_type(n_vectors)
+    compression = choose_compression(n_vectors, compression)
+    if (
+        (index_type == "flat" and compression == "none")
+        or not isinstance(index, faiss.IndexFlat)
+    ):
+        return {"index": describe_index(index), "vectors": n_vectors, "recall": 1.0}
+
+    vectors = index.reconstruct_n(0, n_vectors)
+    optimized = build_index(vectors, index_type, compression)
+    recall = measure_recall(optimized, vectors)
+    vector_store.index = optimized
+
+    report = {
+        "index": describe_index(optimized),
+        "vectors": n_vectors,
+        "recall": recall,
+    }
+    if isinstance(optimized, RerankIndex):
+        report["codes_recall"] = measure_recall(optimized.index, vectors)
+        report["compression_ratio"] = (
+            vectors.nbytes / max(index_memory_bytes(optimized.index), 1)
+        )
+        optimized.report = report
+    logger.info(
+        "Built %s over %d vectors, recall@%d vs flat: %.3f",
+        report["index"], n_vectors, RECALL_K, recall
+    )
+    return report
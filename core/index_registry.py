@@ -0,0 +1,181 @@
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+import streamlit as st
+
+from core.index_factory import describe_index, index_memory_bytes
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------------------------
+# Settings
+# --------------------------------------------------
+INDEX_MEMORY_BUDGET = int(
+    os.getenv("INDEX_MEMORY_BUDGET", str(1024 ** 3))
+)
+
+# Rough per-chunk cost of a LangChain Document beyond its text (object,
+# metadata dict and docstore id strings).
+DOCUMENT_OVERHEAD_BYTES = 400
+
+# --------------------------------------------------
+# Memory accounting
+# --------------------------------------------------
+def docstore_memory_bytes(docstore) -> int:
+    nbytes = getattr(docstore, "nbytes", None)
+    if nbytes is not None:
+        return nbytes
+    return sum(
+        len(doc.page_content) + DOCUMENT_OVERHEAD_BYTES
+        for doc in docstore._dict.values()
+    )
+
+
+def vector_store_memory_bytes(vector_store) -> int:
+    return (
+        index_memory_bytes(vector_store.index)
+        + docstore_memory_bytes(vector_store.docstore)
+    )
+
+# --------------------------------------------------
+# Shared index registry
+# --------------------------------------------------
+# Sessions that process the same PDFs share one in-memory vector store keyed
+# by the corpus hash. Each session holds an IndexLease; when the lease is
+# released or garbage-collected with its session, the reference count drops,
+# and unreferenced stores are evicted least-recently-used first once the
+# registry exceeds its memory budget.
+class IndexLease:
+    def __init__(self, registry, key, vector_store, resident, cached):
+        self.key = key
+        self.vector_store = vector_store
+        self.resident = resident
+        self.cached = cached
+        self._finalizer = weakref.finalize(self, registry._release, key)
+
+    def release(self):
+        self._finalizer()
+
+
+class _Entry:
+    def __init__(self, vector_store, cached):
+        self.vector_store = vector_store
+        self.cached = cached
+        self.nbytes = vector_store_memory_bytes(vector_store)
+        self.refs = 0
+        self.hits = 0
+        self.last_used = time.monotonic()
+
+
+class _KeyLock:
+    # Serializes loads of one key; `waiters` counts acquire calls holding or
+    # waiting for it, so it is only dropped once nobody can still use it.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.waiters = 0
+
+
+class IndexRegistry:
+    def __init__(self, max_bytes: int = INDEX_MEMORY_BUDGET):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def acquire(self, key: str, load) -> IndexLease:
+        # `load` returns (vector_store, cached) like IndexCache.load_or_build;
+        # the per-key lock makes concurrent sessions uploading the same book
+        # wait for one load instead of each building their own copy.
+        with self._lock:
+            key_lock = self._key_locks.get(key)
+            if key_lock is None:
+                key_lock = self._key_locks[key] = _KeyLock()
+            key_lock.waiters += 1
+
+        try:
+            with key_lock.lock:
+                with self._lock:
+                    entry = self._entries.get(key)
+                    resident = entry is not None
+                    if resident:
+                        self._touch(key, entry)
+
+                if not resident:
+                    vector_store, cached = load()
+                    with self._lock:
+                        entry = _Entry(vector_store, cached)
+                        entry.refs = 1
+                        self._entries[key] = entry
+                        self._evict()
+        finally:
+            # Also runs when load() raises, so a failed build never leaves a
+            # stale lock behind.
+            with self._lock:
+                key_lock.waiters -= 1
+                if key_lock.waiters == 0:
+                    self._key_locks.pop(key, None)
+
+        return IndexLease(self, key, entry.vector_store, resident, entry.cached)
+
+    def _touch(self, key, entry):
+        entry.refs += 1
+        entry.hits += 1
+        entry.last_used = time.monotonic()
+        self._entries.move_to_end(key)
+
+    def _release(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.refs -= 1
+            entry.last_used = time.monotonic()
+            self._evict()
+
+    def _evict(self):
+        total = sum(entry.nbytes for entry in self._entries.values())
+        for key, entry in list(self._entries.items()):
+            if total <= self.max_bytes:
+                return
+            if entry.refs > 0:
+                continue
+            del self._entries[key]
+            total -= entry.nbytes
+            logger.info(
+                "Evicted index %s (%.1f MB) from the shared registry",
+                key[:12], entry.nbytes / 1024 ** 2
+            )
+        if total > self.max_bytes:
+            logger.warning(
+                "Index registry holds %.1f MB in use, over its %.1f MB budget",
+                total / 1024 ** 2, self.max_bytes / 1024 ** 2
+            )
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(entry.nbytes for entry in self._entries.values())
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "corpus": key[:12],
+                    "index": describe_index(entry.vector_store.index),
+                    "vectors": entry.vector_store.index.ntotal,
+                    "memory_mb": round(entry.nbytes / 1024 ** 2, 2),
+                    "sessions": entry.refs,
+                    "shared_hits": entry.hits,
+                    "idle_seconds": 0 if entry.refs else round(now - entry.last_used),
+                }
+                for key, entry in reversed(self._entries.items())
+            ]
+
+
+@st.cache_resource
+def get_index_registry():
+    return IndexRegistry()
@@ -0,0 +1,82 @@
+import json
+
+# --------------------------------------------------
+# Incremental JSON array parser
+# --------------------------------------------------
+# Fed the raw token stream of a response shaped like {"questions": [{...},
+# {...}]} (or a bare [{...}]), it returns every object of the first array
+# of objects as soon as its closing brace arrives. Text around the JSON
+# (markdown fences, commentary) is ignored: quotes outside any bracket are
+# prose, and an array only counts once its first element is an object, so
+# "Sure [JSON below]:" is skipped. A truncated or malformed tail only loses
+# the objects it contains.
+class JsonArrayStreamParser:
+    def __init__(self):
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._pending_array = None
+        self._array_depth = None
+        self._item = None
+        self._yielded = 0
+        self._done = False
+
+    def feed(self, text: str):
+        items = []
+
+        for ch in text:
+            if self._done:
+                break
+            if self._item is not None:
+                self._item.append(ch)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if self._pending_array is not None and not ch.isspace():
+                # An opened array is only followed if it holds objects.
+                if ch == "{" and self._depth == self._pending_array:
+                    self._array_depth = self._pending_array
+                self._pending_array = None
+
+            if ch == '"':
+                self._in_string = self._depth > 0
+
+            elif ch in "{[":
+                self._depth += 1
+                if ch == "[" and self._array_depth is None:
+                    self._pending_array = self._depth
+                elif (
+                    ch == "{"
+                    and self._item is None
+                    and self._array_depth is not None
+                    and self._depth == self._array_depth + 1
+                ):
+                    self._item = [ch]
+
+            elif ch in "}]":
+                if (
+                    ch == "}"
+                    and self._item is not None
+                    and self._depth == self._array_depth + 1
+                ):
+                    try:
+                        items.append(json.loads("".join(self._item)))
+                        self._yielded += 1
+                    except json.JSONDecodeError:
+                        pass
+                    self._item = None
+                elif ch == "]" and self._depth == self._array_depth:
+                    # The array is over: stop, unless nothing in it parsed,
+                    # in which case look for the next array of objects.
+                    self._done = self._yielded > 0
+                    self._array_depth = None
+                self._depth = max(self._depth - 1, 0)
+
+        return items
@@ -0,0 +1,53 @@
+import threading
+
+import streamlit as st
+from langchain_huggingface import HuggingFaceEmbeddings
+from langchain.chat_models import init_chat_model
+
+from core.embedding_cache import CachedEmbeddings, EmbeddingCache
+
+# --------------------------------------------------
+# Model settings
+# --------------------------------------------------
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+LLM_MODEL = "llama-3.1-8b-instant"
+LLM_PROVIDER = "groq"
+
+# --------------------------------------------------
+# Shared model registry
+# --------------------------------------------------
+# st.cache_resource keeps a single instance per server process, shared by
+# every page and every user session, so Streamlit reruns never reload the
+# embedding model or rebuild the Groq client (and its connection pool).
+@st.cache_resource(show_spinner="Loading embedding model...")
+def get_embeddings():
+    return CachedEmbeddings(
+        HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL),
+        EmbeddingCache(EMBEDDING_MODEL)
+    )
+
+
+@st.cache_resource
+def get_llm():
+    return init_chat_model(LLM_MODEL, model_provider=LLM_PROVIDER)
+
+
+@st.cache_resource
+def get_embedding_dimension():
+    return len(get_embeddings().embed_query("dimension check"))
+
+# --------------------------------------------------
+# Warm-up
+# --------------------------------------------------
+def _warm_up():
+    get_embedding_dimension()
+    get_llm()
+
+
+@st.cache_resource
+def start_warm_up():
+    # Runs once per process, in the background, so the landing page renders
+    # immediately while the model loads for the first page that needs it.
+    thread = threading.Thread(target=_warm_up, name="model-warm-up", daemon=True)
+    thread.start()
+    return thread
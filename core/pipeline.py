@@ -0,0 +1,333 @@
+import logging
+import os
+import queue
+import threading
+from collections import deque
+from contextlib import closing
+
+import faiss
+import numpy as np
+from PyPDF2 import PdfReader
+from langchain_community.vectorstores import FAISS
+
+from core.docstore import Chunk, CompactDocstore, RowIds
+from core.extraction import iter_pages, timing_report
+from core.index_factory import (
+    VECTOR_COMPRESSION,
+    RerankIndex,
+    build_index,
+    optimize_index,
+    writable_copy,
+)
+from core.models import get_embedding_dimension
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------------------------
+# Settings
+# --------------------------------------------------
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "8"))
+
+# Text is chunked once this much has been buffered; everything but the last
+# chunk is emitted and the last one is carried into the next pass, so chunk
+# boundaries match chunking the whole file.
+SPLIT_BUFFER_CHUNKS = 8
+PAGE_SEPARATOR = "\n"
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+# --------------------------------------------------
+# Queue helpers
+# --------------------------------------------------
+def _put(q, item, stop):
+    # Bounded put that gives up once the consumer has stopped, so a failed
+    # stage never leaves a producer thread blocked forever.
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q):
+    item = q.get()
+    if isinstance(item, _Failure):
+        raise item.error
+    return item
+
+# --------------------------------------------------
+# Pipeline stages
+# --------------------------------------------------
+def _extract_stage(pdf_files, pages_out, stop):
+    try:
+        # closing() removes the spilled uploads as soon as the stage stops.
+        # Timings are totalled as pages stream past, without keeping them.
+        page_count, total, slowest = 0, 0.0, None
+        with closing(iter_pages(pdf_files)) as pages:
+            for page in pages:
+                page_count += 1
+                total += page.seconds
+                if slowest is None or page.seconds > slowest.seconds:
+                    slowest = page._replace(text="")
+                if not _put(pages_out, page, stop):
+                    return
+        logger.info(timing_report(page_count, total, slowest))
+        _put(pages_out, _DONE, stop)
+    except Exception as e:
+        _put(pages_out, _Failure(e), stop)
+
+
+def _chunk_stage(chunker, pages_in, batches_out, stop, file_offset=0):
+    try:
+        flush_at = chunker.chunk_size * SPLIT_BUFFER_CHUNKS
+        # Text not yet fully chunked is kept as pieces (page texts and
+        # separators) and joined once per chunking pass. `resume` is where
+        # chunking continues in the joined text, `base` the document-wide
+        # offset of its first character, and page_offsets where each page
+        # begins, so every chunk span maps back to its page.
+        pieces = deque()
+        pending = 0
+        resume = 0
+        base = 0
+        page_offsets = []
+        page_keys = []
+        current_file = None
+        batch = []
+        pages_done = 0
+
+        def to_chunks(text, starts, ends):
+            page_rows = np.searchsorted(page_offsets, base + starts, side="right") - 1
+            chunks = []
+            for start, end, page in zip(starts.tolist(), ends.tolist(), page_rows.tolist()):
+                file_index, page_number = page_keys[page]
+                chunks.append(
+                    Chunk(
+                        text[start:end],
+                        file_index,
+                        page_number,
+                        base + start - page_offsets[page]
+                    )
+                )
+            return chunks
+
+        def chunk_pending(final):
+            # Every complete chunk of the pending text. Unless final, the
+            # last (still open) window is left to the next pass, which
+            # resumes at its start: the same spans as chunking the whole
+            # file at once.
+            nonlocal pending, resume, base
+            text = "".join(pieces)
+            if final:
+                starts, ends = chunker.spans(text, resume)
+                resume = len(text)
+            else:
+                starts, ends, resume = chunker.partial_spans(text, resume)
+            chunks = to_chunks(text, starts, ends)
+            while pieces and len(pieces[0]) <= resume:
+                size = len(pieces.popleft())
+                pending -= size
+                resume -= size
+                base += size
+            return chunks
+
+        def emit(chunks, final=False):
+            for chunk in chunks:
+                batch.append(chunk)
+                if len(batch) >= EMBED_BATCH_SIZE:
+                    if not _put(batches_out, (list(batch), pages_done), stop):
+                        return False
+                    batch.clear()
+            if final and batch:
+                return _put(batches_out, (list(batch), pages_done), stop)
+            return True
+
+        while True:
+            page = _get(pages_in)
+            if page is _DONE:
+                break
+
+            if page.file_index != current_file:
+                # Chunks never span two files, so a corpus grown one upload
+                # at a time matches one ingested in a single pass.
+                if not emit(chunk_pending(final=True)):
+                    return
+                current_file = page.file_index
+
+            if not page.text.strip():
+                # Scanned or blank page: nothing to chunk.
+                pages_done += 1
+                continue
+
+            page_offsets.append(base + pending)
+            page_keys.append((file_offset + page.file_index, page.page_number))
+            # The separator keeps the last word of a page from running into
+            # the first word of the next.
+            pieces.append(page.text)
+            pieces.append(PAGE_SEPARATOR)
+            pending += len(page.text) + len(PAGE_SEPARATOR)
+            pages_done += 1
+
+            if pending - resume >= flush_at and not emit(chunk_pending(final=False)):
+                return
+
+        if not emit(chunk_pending(final=True), final=True):
+            return
+        _put(batches_out, _DONE, stop)
+    except Exception as e:
+        _put(batches_out, _Failure(e), stop)
+
+# --------------------------------------------------
+# Vector store
+# --------------------------------------------------
+def empty_vector_store(embeddings):
+    return FAISS(
+        embedding_function=embeddings,
+        index=faiss.IndexFlatL2(get_embedding_dimension()),
+        docstore=CompactDocstore(),
+        index_to_docstore_id=RowIds()
+    )
+
+
+def count_pages(pdf_files) -> int:
+    # PdfReader reads the upload in place; only the page tree is parsed.
+    total = 0
+    for pdf_file in pdf_files:
+        pdf_file.seek(0)
+        total += len(PdfReader(pdf_file).pages)
+        pdf_file.seek(0)
+    return total
+
+# --------------------------------------------------
+# Streaming ingestion
+# --------------------------------------------------
+def _ingest_into(vector_store, pdf_files, embeddings, chunker, on_progress,
+                 file_offset=0):
+    # extract (process pool) -> chunk (thread) -> embed (caller's thread),
+    # connected by bounded queues so pages are chunked as soon as they are
+    # extracted and chunks are embedded while later pages are still parsed.
+    total_pages = count_pages(pdf_files)
+
+    pages_q = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE * EMBED_BATCH_SIZE)
+    batches_q = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    stop = threading.Event()
+
+    workers = [
+        threading.Thread(
+            target=_extract_stage,
+            args=(pdf_files, pages_q, stop),
+            name="ingest-extract",
+            daemon=True
+        ),
+        threading.Thread(
+            target=_chunk_stage,
+            args=(chunker, pages_q, batches_q, stop, file_offset),
+            name="ingest-chunk",
+            daemon=True
+        ),
+    ]
+    for worker in workers:
+        worker.start()
+
+    chunks_done = 0
+    try:
+        while True:
+            item = _get(batches_q)
+            if item is _DONE:
+                break
+
+            chunks, pages_done = item
+            vectors = embeddings.embed_documents([chunk.text for chunk in chunks])
+            # Rows go straight into the index and the compact docstore; no
+            # per-chunk Document or id string is ever created.
+            vector_store.index.add(np.asarray(vectors, dtype=np.float32))
+            vector_store.docstore.extend(chunks)
+            vector_store.index_to_docstore_id.extend(len(chunks))
+            chunks_done += len(chunks)
+
+            if on_progress:
+                on_progress(pages_done, total_pages, chunks_done)
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join(timeout=1)
+
+    if on_progress:
+        on_progress(total_pages, total_pages, chunks_done)
+
+
+def ingest_pdfs(pdf_files, embeddings, chunker, on_progress=None,
+                compression=VECTOR_COMPRESSION):
+    vector_store = empty_vector_store(embeddings)
+    _ingest_into(vector_store, pdf_files, embeddings, chunker, on_progress)
+    optimize_index(vector_store, compression)
+    return vector_store
+
+# --------------------------------------------------
+# Incremental updates
+# --------------------------------------------------
+def _copy_index(index):
+    if isinstance(index, RerankIndex):
+        copied = RerankIndex(
+            writable_copy(index.index), np.array(index.vectors), index.compression
+        )
+        copied.report = dict(index.report)
+        return copied
+    return writable_copy(index)
+
+
+def copy_vector_store(vector_store):
+    # Registry stores are shared between sessions and usually memory-mapped,
+    # so every change is made to a private, writable copy.
+    docstore = vector_store.docstore.copy()
+    return FAISS(
+        embedding_function=vector_store.embedding_function,
+        index=_copy_index(vector_store.index),
+        docstore=docstore,
+        index_to_docstore_id=RowIds(len(docstore))
+    )
+
+
+def extend_vector_store(vector_store, pdf_files, embeddings, chunker,
+                        file_offset, on_progress=None,
+                        compression=VECTOR_COMPRESSION):
+    # Only the new files are extracted and embedded; existing rows are
+    # copied as they are.
+    vector_store = copy_vector_store(vector_store)
+    _ingest_into(
+        vector_store, pdf_files, embeddings, chunker, on_progress, file_offset
+    )
+    optimize_index(vector_store, compression)
+    return vector_store
+
+
+def remove_files(vector_store, file_indices):
+    # The docstore's per-row file index is the id map: drop those rows from
+    # the index where faiss supports removal, otherwise rebuild the index
+    # from the remaining stored vectors. Nothing is re-embedded.
+    docstore, removed = vector_store.docstore.without_files(file_indices)
+
+    index = vector_store.index
+    compression = getattr(index, "compression", "none")
+    try:
+        updated = _copy_index(index)
+        updated.remove_ids(removed)
+    except RuntimeError:
+        keep = np.ones(index.ntotal, dtype=bool)
+        keep[removed] = False
+        vectors = index.reconstruct_n(0, index.ntotal)[keep]
+        updated = build_index(vectors, compression=compression)
+
+    return FAISS(
+        embedding_function=vector_store.embedding_function,
+        index=updated,
+        docstore=docstore,
+        index_to_docstore_id=RowIds(len(docstore))
+    )
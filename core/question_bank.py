@@ -0,0 +1,214 @@
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import zlib
+
+import streamlit as st
+
+from core.quiz import generate_quiz
+from core.storage import connect, nearest_row, unit_vector
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------------------------
+# Settings
+# --------------------------------------------------
+BANK_TOPIC_THRESHOLD = float(os.getenv("BANK_TOPIC_THRESHOLD", "0.85"))
+BANK_TARGET_SIZE = int(os.getenv("BANK_TARGET_SIZE", "60"))
+BANK_REPLENISH_BATCH = int(os.getenv("BANK_REPLENISH_BATCH", "20"))
+
+# --------------------------------------------------
+# Helpers
+# --------------------------------------------------
+def _pack(question) -> bytes:
+    return zlib.compress(
+        json.dumps(question, separators=(",", ":")).encode()
+    )
+
+
+def _unpack(blob: bytes):
+    return json.loads(zlib.decompress(blob))
+
+
+def _question_hash(question) -> str:
+    text = " ".join(question["question"].split()).casefold()
+    return hashlib.sha1(text.encode()).hexdigest()
+
+# --------------------------------------------------
+# Question bank
+# --------------------------------------------------
+# Validated questions per (corpus, topic); a topic matches an existing one
+# when their embeddings are within BANK_TOPIC_THRESHOLD cosine similarity.
+# Each question is stored as zlib-compressed compact JSON.
+class QuestionBank:
+    def __init__(self, conn=None):
+        self.conn = conn or connect("question_bank")
+        self._lock = threading.Lock()
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS bank_topics (
+                id INTEGER PRIMARY KEY,
+                corpus TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                embedding BLOB NOT NULL
+            )
+            """
+        )
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS bank_questions (
+                id INTEGER PRIMARY KEY,
+                topic_id INTEGER NOT NULL,
+                question_hash TEXT NOT NULL,
+                data BLOB NOT NULL,
+                created REAL NOT NULL,
+                UNIQUE (topic_id, question_hash)
+            )
+            """
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS bank_topics_corpus ON bank_topics (corpus)"
+        )
+
+    def topic_id(self, corpus: str, topic: str, topic_vector) -> int:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT id, embedding FROM bank_topics WHERE corpus = ?",
+                (corpus,)
+            ).fetchall()
+            existing = nearest_row(rows, topic_vector, BANK_TOPIC_THRESHOLD)
+            if existing is not None:
+                return existing
+
+            return self.conn.execute(
+                "INSERT INTO bank_topics (corpus, topic, embedding) VALUES (?, ?, ?)",
+                (corpus, topic, unit_vector(topic_vector).tobytes())
+            ).lastrowid
+
+    def count(self, topic_id: int) -> int:
+        with self._lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM bank_questions WHERE topic_id = ?",
+                (topic_id,)
+            ).fetchone()[0]
+
+    def sample(self, topic_id: int, n: int):
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT data FROM bank_questions WHERE topic_id = ? "
+                "ORDER BY RANDOM() LIMIT ?",
+                (topic_id, n)
+            ).fetchall()
+        return [_unpack(row[0]) for row in rows]
+
+    def questions(self, topic_id: int):
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT data FROM bank_questions WHERE topic_id = ? ORDER BY id",
+                (topic_id,)
+            ).fetchall()
+        return [_unpack(row[0]) for row in rows]
+
+    def add(self, topic_id: int, questions):
+        now = time.time()
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO bank_questions "
+                "(topic_id, question_hash, data, created) VALUES (?, ?, ?, ?)",
+                [
+                    (topic_id, _question_hash(q), _pack(q), now)
+                    for q in questions
+                ]
+            )
+
+# --------------------------------------------------
+# Background replenishment
+# --------------------------------------------------
+class BankReplenisher:
+    def __init__(self, bank: QuestionBank):
+        self.bank = bank
+        self._jobs = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        threading.Thread(
+            target=self._run, name="question-bank-replenisher", daemon=True
+        ).start()
+
+    def schedule(self, topic_id: int, vector_store, topic: str):
+        with self._lock:
+            if topic_id in self._pending:
+                return
+            self._pending.add(topic_id)
+        self._jobs.put((topic_id, vector_store, topic))
+
+    def _run(self):
+        while True:
+            topic_id, vector_store, topic = self._jobs.get()
+            try:
+                existing = self.bank.questions(topic_id)
+                missing = BANK_TARGET_SIZE - len(existing)
+                if missing > 0:
+                    generated = generate_quiz(
+                        vector_store,
+                        topic,
+                        len(existing) + min(missing, BANK_REPLENISH_BATCH),
+                        existing=existing
+                    )
+                    self.bank.add(topic_id, generated)
+            except Exception:
+                logger.exception("Failed to replenish question bank for %r", topic)
+            finally:
+                with self._lock:
+                    self._pending.discard(topic_id)
+
+
+@st.cache_resource
+def get_question_bank():
+    return QuestionBank()
+
+
+@st.cache_resource
+def get_bank_replenisher():
+    return BankReplenisher(get_question_bank())
+
+# --------------------------------------------------
+# Serving
+# --------------------------------------------------
+def serve_quiz(
+    vector_store,
+    corpus: str,
+    topic: str,
+    num_questions: int,
+    on_progress=None,
+    on_question=None
+):
+    # Sample from the bank first and only call the LLM for the shortfall;
+    # the bank is then topped up in the background for the next student.
+    bank = get_question_bank()
+    topic_id = bank.topic_id(
+        corpus, topic, vector_store.embedding_function.embed_query(topic)
+    )
+
+    questions = bank.sample(topic_id, num_questions)
+    from_bank = len(questions)
+
+    if from_bank < num_questions:
+        questions = generate_quiz(
+            vector_store,
+            topic,
+            num_questions,
+            existing=questions,
+            on_progress=on_progress,
+            on_question=on_question
+        )
+        # Already-banked questions are ignored by their hash.
+        bank.add(topic_id, questions)
+
+    if bank.count(topic_id) < BANK_TARGET_SIZE:
+        get_bank_replenisher().schedule(topic_id, vector_store, topic)
+
+    return questions, from_bank
@@ -0,0 +1,232 @@
+import asyncio
+import math
+import os
+from itertools import cycle, islice
+
+import numpy as np
+from langchain_core.prompts import PromptTemplate
+
+from core.concurrency import gather_bounded, run_async
+from core.embedding_cache import uncached
+from core.json_stream import JsonArrayStreamParser
+from core.models import get_llm
+
+# --------------------------------------------------
+# Settings
+# --------------------------------------------------
+QUESTIONS_PER_SHARD = int(os.getenv("QUESTIONS_PER_SHARD", "5"))
+CHUNKS_PER_SHARD = int(os.getenv("CHUNKS_PER_SHARD", "3"))
+DUPLICATE_THRESHOLD = float(os.getenv("QUIZ_DUPLICATE_THRESHOLD", "0.9"))
+MAX_TOP_UP_ROUNDS = int(os.getenv("QUIZ_TOP_UP_ROUNDS", "2"))
+AVOID_LIST_SIZE = 20
+
+OPTION_KEYS = ("a", "b", "c", "d")
+
+# --------------------------------------------------
+# Prompt Template
+# --------------------------------------------------
+quiz_prompt = PromptTemplate.from_template(
+    """
+You are an expert quiz maker.
+
+Generate {num_questions} multiple choice questions based on the context below.
+Each question must have 4 options (a, b, c, d) and exactly one correct answer.
+{avoid}
+Return ONLY valid JSON in the following structure:
+
+{{
+  "questions": [
+    {{
+      "question": "question text",
+      "options": {{
+        "a": "option a",
+        "b": "option b",
+        "c": "option c",
+        "d": "option d"
+      }},
+      "correct_answer": "a"
+    }}
+  ]
+}}
+
+Context:
+{context}
+
+Topic:
+{topic}
+"""
+)
+
+# --------------------------------------------------
+# Parsing & validation
+# --------------------------------------------------
+def is_valid_question(question) -> bool:
+    if not isinstance(question, dict):
+        return False
+    options = question.get("options")
+    return (
+        isinstance(question.get("question"), str)
+        and bool(question["question"].strip())
+        and isinstance(options, dict)
+        and all(isinstance(options.get(key), str) for key in OPTION_KEYS)
+        and question.get("correct_answer") in OPTION_KEYS
+    )
+
+
+class QuestionDeduplicator:
+    # Greedy near-duplicate filter: a question is kept only if its embedding
+    # is below the cosine threshold against every question kept so far.
+    def __init__(self, embeddings, threshold: float = DUPLICATE_THRESHOLD):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self._vectors = None
+
+    def _embed(self, questions) -> np.ndarray:
+        vectors = np.asarray(
+            self.embeddings.embed_documents([q["question"] for q in questions]),
+            dtype=np.float32
+        )
+        return vectors / (np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12)
+
+    def _keep(self, questions, vectors):
+        kept = []
+        for question, vector in zip(questions, vectors):
+            if self._vectors is not None and float(np.max(self._vectors @ vector)) >= self.threshold:
+                continue
+            self._vectors = (
+                vector[None, :] if self._vectors is None
+                else np.vstack([self._vectors, vector])
+            )
+            kept.append(question)
+        return kept
+
+    def add_many(self, questions):
+        if not questions:
+            return []
+        return self._keep(questions, self._embed(questions))
+
+    async def aadd_many(self, questions):
+        # The embedding model runs in a worker thread, so it never blocks the
+        # shared event loop (and other sessions' LLM calls) while it works.
+        if not questions:
+            return []
+        vectors = await asyncio.to_thread(self._embed, questions)
+        return self._keep(questions, vectors)
+
+    def add(self, question) -> bool:
+        return bool(self.add_many([question]))
+
+    async def aadd(self, question) -> bool:
+        return bool(await self.aadd_many([question]))
+
+
+def deduplicate(questions, embeddings, threshold: float = DUPLICATE_THRESHOLD):
+    return QuestionDeduplicator(embeddings, threshold).add_many(questions)
+
+# --------------------------------------------------
+# Sharded generation
+# --------------------------------------------------
+def _avoid_text(questions) -> str:
+    if not questions:
+        return ""
+    # Only the most recent ones, to bound the prompt; embedding dedup still
+    # checks against all of them.
+    listed = "\n".join(f"- {q['question']}" for q in questions[-AVOID_LIST_SIZE:])
+    return f"\nDo not repeat or rephrase any of these existing questions:\n{listed}\n"
+
+
+async def _generate_shards(vector_store, topic, num_questions, existing, emit):
+    if vector_store.index.ntotal == 0:
+        # No extractable text (only scanned or blank pages): nothing to
+        # base questions on.
+        return list(existing)[:num_questions]
+
+    chain = quiz_prompt | get_llm()
+    # Generated questions are one-off texts: embed them with the model itself
+    # rather than persisting them in the chunk embedding cache.
+    deduplicator = QuestionDeduplicator(uncached(vector_store.embedding_function))
+    emit = emit or (lambda event: None)
+
+    # One pool of relevant chunks, dealt out so every shard (including
+    # top-up shards) sees different context.
+    max_shards = math.ceil(num_questions / QUESTIONS_PER_SHARD) * (1 + MAX_TOP_UP_ROUNDS)
+    pool = await asyncio.to_thread(
+        vector_store.similarity_search,
+        topic,
+        k=min(max_shards * CHUNKS_PER_SHARD, vector_store.index.ntotal)
+    )
+    chunks = cycle(pool) if pool else None
+
+    questions = await deduplicator.aadd_many(list(existing))
+
+    async def run_shard(size, docs, avoid):
+        # Questions are parsed out of the token stream one object at a time,
+        # so each is available (and emitted) as soon as it closes; a broken
+        # tail only loses its own questions, which the next round requests.
+        parser = JsonArrayStreamParser()
+        received = 0
+        async for chunk in chain.astream(
+            {
+                "num_questions": size,
+                "context": "\n\n".join(doc.page_content for doc in docs),
+                "topic": topic,
+                "avoid": avoid,
+            }
+        ):
+            for question in parser.feed(chunk.content):
+                if received >= size or len(questions) >= num_questions:
+                    return
+                if not is_valid_question(question):
+                    continue
+                received += 1
+                # Other shards may fill the quiz while this one embeds.
+                if await deduplicator.aadd(question) and len(questions) < num_questions:
+                    questions.append(question)
+                    emit(("question", question))
+
+    for round_number in range(1 + MAX_TOP_UP_ROUNDS):
+        missing = num_questions - len(questions)
+        if missing <= 0:
+            break
+
+        sizes = [QUESTIONS_PER_SHARD] * (missing // QUESTIONS_PER_SHARD)
+        if missing % QUESTIONS_PER_SHARD:
+            sizes.append(missing % QUESTIONS_PER_SHARD)
+
+        avoid = _avoid_text(questions)
+        shards = [
+            run_shard(
+                size,
+                list(islice(chunks, CHUNKS_PER_SHARD)) if chunks else [],
+                avoid
+            )
+            for size in sizes
+        ]
+        await gather_bounded(
+            shards,
+            on_done=lambda done, total, r=round_number: emit(("shard", r, done, total))
+        )
+
+    return questions[:num_questions]
+
+
+def generate_quiz(
+    vector_store,
+    topic: str,
+    num_questions: int,
+    existing=(),
+    on_progress=None,
+    on_question=None
+):
+    def on_event(event):
+        if event[0] == "shard" and on_progress:
+            on_progress(*event[1:])
+        elif event[0] == "question" and on_question:
+            on_question(event[1])
+
+    return run_async(
+        lambda emit: _generate_shards(
+            vector_store, topic, num_questions, existing, emit
+        ),
+        on_event=on_event
+    )
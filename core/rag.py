@@ -0,0 +1,227 @@
+import os
+import re
+
+import streamlit as st
+from typing_extensions import List, TypedDict, Annotated
+
+from langchain_core.documents import Document
+from langchain_core.runnables import RunnableConfig
+from langgraph.graph import END, START, StateGraph
+
+from core.models import get_llm
+from core.retrieval import (
+    CONTEXT_TOKEN_BUDGET,
+    MAX_SUB_QUERIES,
+    format_context,
+    pack_context,
+    retriever_search,
+)
+
+# --------------------------------------------------
+# Settings
+# --------------------------------------------------
+# Questions this short that read as a single sentence are used as the search
+# query directly instead of paying an LLM round-trip to rewrite them.
+SHORT_QUESTION_WORDS = int(os.getenv("SHORT_QUESTION_WORDS", "12"))
+
+# Comparisons and conjunctions usually need one search per part, so such
+# questions always go through the rewrite that splits them into sub-queries.
+COMPOUND_MARKERS = re.compile(
+    r"\b(compare|comparison|vs|versus|and|or|both|between|differences?)\b",
+    re.IGNORECASE
+)
+
+# --------------------------------------------------
+# LangGraph state definitions
+# --------------------------------------------------
+class Search(TypedDict):
+    queries: Annotated[
+        List[str],
+        ...,
+        "Search queries for the question: one per distinct part or entity "
+        "(e.g. one per item being compared), at most "
+        f"{MAX_SUB_QUERIES}; a single query for a simple question",
+    ]
+
+
+class State(TypedDict):
+    question: str
+    query: Search
+    speculative_context: List[Document]
+    context: List[Document]
+    answer: str
+
+# --------------------------------------------------
+# Query routing
+# --------------------------------------------------
+def _normalize(text: str) -> str:
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+def is_well_formed(question: str) -> bool:
+    words = question.split()
+    sentences = [s for s in re.split(r"[.?!]+", question) if s.strip()]
+    return (
+        0 < len(words) <= SHORT_QUESTION_WORDS
+        and "\n" not in question.strip()
+        and len(sentences) <= 1
+        and not COMPOUND_MARKERS.search(question)
+    )
+
+
+def route_question(state: State, config: RunnableConfig):
+    if not config["configurable"].get("speculative", True):
+        return "analyze_query"
+    if is_well_formed(state["question"]):
+        return "retrieve"
+    # Retrieve on the raw question while the rewrite is in flight.
+    return ["analyze_query", "speculative_retrieve"]
+
+
+def _merge_documents(primary, secondary):
+    merged = []
+    seen = set()
+    for pair in zip(primary, secondary):
+        for doc in pair:
+            if doc.page_content not in seen:
+                seen.add(doc.page_content)
+                merged.append(doc)
+    for doc in primary[len(secondary):] + secondary[len(primary):]:
+        if doc.page_content not in seen:
+            seen.add(doc.page_content)
+            merged.append(doc)
+    return merged
+
+# --------------------------------------------------
+# Graph nodes
+# --------------------------------------------------
+# Per-request dependencies (retriever, prompt) travel in
+# config["configurable"], so one compiled graph serves every page and
+# session.
+def analyze_query(state: State):
+    structured_llm = get_llm().with_structured_output(Search)
+    query = structured_llm.invoke(state["question"])
+    return {"query": query}
+
+
+def speculative_retrieve(state: State, config: RunnableConfig):
+    retriever = config["configurable"]["retriever"]
+    return {
+        "speculative_context": retriever_search(retriever, [state["question"]])
+    }
+
+
+def retrieve(state: State, config: RunnableConfig):
+    retriever = config["configurable"]["retriever"]
+    queries = state.get("query", {}).get("queries") or [state["question"]]
+    speculative_docs = state.get("speculative_context")
+
+    if speculative_docs is not None and [
+        _normalize(query) for query in queries
+    ] == [_normalize(state["question"])]:
+        # The rewrite did not change the query: keep the speculative hits.
+        return {"context": speculative_docs}
+
+    # Sub-queries are embedded and searched together, then rank-fused.
+    retrieved_docs = retriever_search(retriever, queries)
+    if speculative_docs:
+        retrieved_docs = _merge_documents(retrieved_docs, speculative_docs)
+    return {"context": retrieved_docs}
+
+
+def generate(state: State, config: RunnableConfig):
+    prompt = config["configurable"]["prompt"]
+    token_budget = config["configurable"].get("token_budget", CONTEXT_TOKEN_BUDGET)
+    # Overlapping neighbours are merged and the rest trimmed to the budget,
+    # so a larger retriever k does not grow the prompt unboundedly.
+    # Passages are labelled with their pages for the answer to cite.
+    context_text = format_context(
+        pack_context(state["context"], token_budget),
+        config["configurable"].get("file_names")
+    )
+    messages = prompt.invoke(
+        {
+            "question": state["question"],
+            "context": context_text
+        }
+    )
+    response = get_llm().invoke(messages)
+    return {"answer": response.content}
+
+# --------------------------------------------------
+# Compiled graph (one per server process)
+# --------------------------------------------------
+@st.cache_resource
+def get_rag_graph():
+    graph_builder = StateGraph(State)
+
+    graph_builder.add_node("analyze_query", analyze_query)
+    graph_builder.add_node("speculative_retrieve", speculative_retrieve)
+    graph_builder.add_node("retrieve", retrieve)
+    graph_builder.add_node("generate", generate)
+
+    graph_builder.add_conditional_edges(
+        START,
+        route_question,
+        ["analyze_query", "speculative_retrieve", "retrieve"]
+    )
+    graph_builder.add_edge("analyze_query", "retrieve")
+    graph_builder.add_edge("speculative_retrieve", END)
+    graph_builder.add_edge("retrieve", "generate")
+
+    return graph_builder.compile()
+
+
+def rag_config(retriever, prompt, speculative: bool = True,
+               token_budget: int = CONTEXT_TOKEN_BUDGET,
+               file_names=None) -> RunnableConfig:
+    return {
+        "configurable": {
+            "retriever": retriever,
+            "prompt": prompt,
+            "speculative": speculative,
+            "token_budget": token_budget,
+            "file_names": file_names,
+        }
+    }
+
+# --------------------------------------------------
+# Graph execution
+# --------------------------------------------------
+def answer_question(question: str, retriever, prompt) -> str:
+    result = get_rag_graph().invoke(
+        {"question": question},
+        config=rag_config(retriever, prompt)
+    )
+    return result["answer"]
+
+
+def answer_questions(questions, retriever, prompt):
+    results = get_rag_graph().batch(
+        [{"question": question} for question in questions],
+        config=rag_config(retriever, prompt)
+    )
+    return [result["answer"] for result in results]
+
+
+def stream_answer(question: str, retriever, prompt, speculative: bool = True,
+                  file_names=None):
+    # stream_mode="messages" surfaces the tokens of the LLM call inside the
+    # generate node; the rewrite call in analyze_query is filtered out.
+    for message, metadata in get_rag_graph().stream(
+        {"question": question},
+        config=rag_config(
+            retriever, prompt, speculative, file_names=file_names
+        ),
+        stream_mode="messages"
+    ):
+        if metadata.get("langgraph_node") == "generate" and message.content:
+            yield message.content
+
+
+async def aanswer_questions(questions, retriever, prompt):
+    results = await get_rag_graph().abatch(
+        [{"question": question} for question in questions],
+        config=rag_config(retriever, prompt)
+    )
+    return [result["answer"] for result in results]
@@ -0,0 +1,242 @@
+import os
+
+import numpy as np
+from langchain_core.documents import Document
+
+from core.embedding_cache import uncached
+from core.summarize import estimate_tokens
+
+# --------------------------------------------------
+# Settings
+# --------------------------------------------------
+MAX_SUB_QUERIES = int(os.getenv("MAX_SUB_QUERIES", "4"))
+
+# Candidates fetched per sub-query before fusion, and the usual reciprocal
+# rank fusion constant (rank 1 scores 1/61, so no single list dominates).
+MULTI_QUERY_FETCH_K = int(os.getenv("MULTI_QUERY_FETCH_K", "20"))
+RRF_K = 60
+
+# Relevance vs diversity weight for MMR retrievers (LangChain's default).
+MMR_LAMBDA = 0.5
+
+# Prompt tokens available for retrieved context in the RAG answer.
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))
+MAX_OVERLAP_CHARS = 400
+
+# --------------------------------------------------
+# Reciprocal rank fusion
+# --------------------------------------------------
+def reciprocal_rank_fusion(ranked_rows, k: int = RRF_K):
+    # ranked_rows: one row-id sequence per query, best first (-1 = no hit).
+    # A chunk found by several sub-queries accumulates their scores, so it
+    # appears once and ranks above chunks only one query liked.
+    scores = {}
+    for rows in ranked_rows:
+        for rank, row in enumerate(rows):
+            row = int(row)
+            if row < 0:
+                continue
+            scores[row] = scores.get(row, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=lambda row: (-scores[row], row))
+
+# --------------------------------------------------
+# Multi-query search
+# --------------------------------------------------
+def _unit_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _mmr(query_vectors, candidate_vectors, k: int, lambda_mult: float, seed):
+    # Greedy maximal marginal relevance over the fused candidates. Relevance
+    # is the best cosine similarity to any sub-query; the `seed` positions
+    # (each sub-query's top hit) are selected first.
+    candidates = _unit_rows(candidate_vectors)
+    relevance = (candidates @ _unit_rows(query_vectors).T).max(axis=1)
+    similarity = candidates @ candidates.T
+
+    selected = list(seed)
+    while len(selected) < min(k, len(candidates)):
+        redundancy = (
+            similarity[:, selected].max(axis=1) if selected
+            else np.zeros(len(candidates))
+        )
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[selected] = -np.inf
+        selected.append(int(np.argmax(scores)))
+    return selected
+
+
+def multi_query_search(vector_store, queries, k: int,
+                       fetch_k: int = MULTI_QUERY_FETCH_K,
+                       mmr: bool = False, lambda_mult: float = MMR_LAMBDA):
+    # All sub-queries are embedded in one batch and searched with a single
+    # matrix index.search call, then fused; k results per sub-query. With
+    # mmr=True the fused candidates are re-selected for diversity, as the
+    # MMR retriever does for a single query.
+    queries = list(dict.fromkeys(q for q in queries if q.strip()))[:MAX_SUB_QUERIES]
+    if not queries or vector_store.index.ntotal == 0:
+        return []
+
+    # Queries go to the model directly: caching them would fill the chunk
+    # embedding cache with one-off texts and skew its hit rate.
+    vectors = np.asarray(
+        uncached(vector_store.embedding_function).embed_documents(queries),
+        dtype=np.float32
+    )
+    fetch_k = min(max(fetch_k, k), vector_store.index.ntotal)
+    _, rows = vector_store.index.search(vectors, fetch_k)
+
+    fused = reciprocal_rank_fusion(rows)
+    limit = k * len(queries)
+
+    # Every sub-query keeps its best hit, so one part of a compound question
+    # is never crowded out by chunks the other parts happen to agree on.
+    best = {int(row) for row in rows[:, 0] if row >= 0}
+    if mmr:
+        candidates = np.asarray(fused, dtype=np.int64)
+        candidate_vectors = np.vstack(
+            [vector_store.index.reconstruct(int(row)) for row in candidates]
+        )
+        seed = [position for position, row in enumerate(fused) if row in best]
+        selected = set(
+            candidates[_mmr(vectors, candidate_vectors, limit, lambda_mult, seed)]
+            .tolist()
+        )
+    else:
+        extra = [row for row in fused if row not in best]
+        selected = best | set(extra[:max(0, limit - len(best))])
+
+    mapping = vector_store.index_to_docstore_id
+    return [
+        vector_store.docstore.search(mapping[row])
+        for row in fused if row in selected
+    ]
+
+
+def retriever_search(retriever, queries):
+    # Uses the store, k and search type of the page's retriever, so callers
+    # keep passing the same retriever object they always have.
+    search_kwargs = retriever.search_kwargs
+    return multi_query_search(
+        retriever.vectorstore,
+        queries,
+        search_kwargs.get("k", 4),
+        search_kwargs.get("fetch_k", MULTI_QUERY_FETCH_K),
+        mmr=retriever.search_type == "mmr",
+        lambda_mult=search_kwargs.get("lambda_mult", MMR_LAMBDA)
+    )
+
+# --------------------------------------------------
+# Context packing
+# --------------------------------------------------
+def _row(doc):
+    # Compact-docstore documents carry their FAISS row as id; neighbouring
+    # rows of the same file are neighbouring (overlapping) chunks.
+    try:
+        return doc.metadata["file_index"], int(doc.id)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _overlap(previous: str, following: str) -> int:
+    # Characters at the start of `following` already at the end of
+    # `previous` (the splitter's chunk overlap).
+    for size in range(min(len(previous), len(following), MAX_OVERLAP_CHARS), 0, -1):
+        if previous.endswith(following[:size]):
+            return size
+    return 0
+
+
+def pack_context(docs, token_budget: int = CONTEXT_TOKEN_BUDGET):
+    # docs arrive best first. Duplicates are dropped, chunks are admitted in
+    # relevance order while their new (non-overlapping) text fits the
+    # budget, and runs of adjacent chunks are merged into one passage with
+    # the repeated overlap removed. Passages keep relevance order.
+    selected = {}
+    order = []
+    seen_text = set()
+    used = 0
+
+    for doc in docs:
+        if doc.page_content in seen_text:
+            continue
+        key = _row(doc) or ("text", doc.page_content)
+        if key in selected:
+            continue
+
+        text = doc.page_content
+        cost_chars = len(text)
+        if key[0] != "text":
+            file_index, row = key
+            before = selected.get((file_index, row - 1))
+            after = selected.get((file_index, row + 1))
+            if before is not None:
+                cost_chars -= _overlap(before.page_content, text)
+            if after is not None:
+                cost_chars -= _overlap(text, after.page_content)
+
+        cost = estimate_tokens(text[:max(cost_chars, 0)])
+        if used + cost > token_budget and order:
+            continue
+        used += cost
+        selected[key] = doc
+        order.append(key)
+        seen_text.add(text)
+
+    rank = {key: position for position, key in enumerate(order)}
+    passages = []
+    run = []
+    for key in sorted(selected, key=lambda key: (key[0] == "text", key)):
+        if run and not (
+            key[0] != "text" and run[-1][0] == key[0] and run[-1][1] + 1 == key[1]
+        ):
+            passages.append(run)
+            run = []
+        run.append(key)
+    if run:
+        passages.append(run)
+
+    packed = []
+    for run in sorted(passages, key=lambda run: min(rank[key] for key in run)):
+        first = selected[run[0]]
+        text = first.page_content
+        for previous, key in zip(run, run[1:]):
+            following = selected[key].page_content
+            text += following[_overlap(selected[previous].page_content, following):]
+        last = selected[run[-1]]
+        packed.append(
+            Document(
+                id=first.id,
+                page_content=text,
+                metadata={
+                    **first.metadata,
+                    "chunks": len(run),
+                    "last_page": last.metadata.get("page", first.metadata.get("page")),
+                }
+            )
+        )
+    return packed
+
+
+def page_label(doc, file_names=None) -> str:
+    # "p. 12" or "p. 12–13" for a passage spanning pages, prefixed with the
+    # file name when the corpus has more than one PDF. Pages are 1-based.
+    page = doc.metadata.get("page")
+    if page is None:
+        return ""
+    last_page = doc.metadata.get("last_page", page)
+    label = f"p. {page + 1}" if last_page == page else f"p. {page + 1}–{last_page + 1}"
+    file_index = doc.metadata.get("file_index")
+    if file_names and len(file_names) > 1 and file_index is not None:
+        label = f"{file_names[file_index]}, {label}"
+    return label
+
+
+def format_context(passages, file_names=None) -> str:
+    # Each passage is headed by its page label so answers can cite pages.
+    blocks = []
+    for doc in passages:
+        label = page_label(doc, file_names)
+        blocks.append(f"[{label}]\n{doc.page_content}" if label else doc.page_content)
+    return "\n\n".join(blocks)
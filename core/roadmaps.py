@@ -0,0 +1,214 @@
+import logging
+import os
+import threading
+import time
+
+import streamlit as st
+from langchain_core.prompts import PromptTemplate
+
+from core.models import get_llm
+from core.storage import connect
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------------------------
+# Settings
+# --------------------------------------------------
+# Bump PROMPT_VERSION whenever the prompt below changes so cached roadmaps
+# from the old prompt are no longer served.
+PROMPT_VERSION = 1
+
+ROADMAP_CACHE_TTL = int(os.getenv("ROADMAP_CACHE_TTL", str(30 * 24 * 3600)))
+ROADMAP_POPULAR_DOMAINS = int(os.getenv("ROADMAP_POPULAR_DOMAINS", "20"))
+ROADMAP_USAGE_WINDOW = int(os.getenv("ROADMAP_USAGE_WINDOW", str(14 * 24 * 3600)))
+ROADMAP_REFRESH_INTERVAL = int(os.getenv("ROADMAP_REFRESH_INTERVAL", "3600"))
+
+# --------------------------------------------------
+# Prompt Template
+# --------------------------------------------------
+prompt = PromptTemplate.from_template(
+    """
+You are an expert curriculum designer and technical educator.
+Your task is to create a detailed learning roadmap for the domain: {domain}.
+
+Generate a comprehensive, topic-based (not time-based) roadmap that progresses
+from absolute basics to advanced expert level.
+
+Format the roadmap with:
+
+# 🚀 [Domain] Learning Roadmap
+
+## 📚 Foundation Level
+🔹 **Topic 1**:
+   - Key concepts
+   - Practical applications
+   - Resources (books/courses)
+
+🔹 **Topic 2**:
+   - Key concepts
+   - Practical applications
+   - Resources
+
+## 🏗️ Intermediate Level
+🔸 **Topic 1**:
+   - Key concepts
+   - Practical applications
+   - Resources
+
+## 🎯 Advanced Level
+🔺 **Topic 1**:
+   - Key concepts
+   - Practical applications
+   - Resources
+
+## 🏫 Expert Level
+🌟 **Topic 1**:
+   - Key concepts
+   - Practical applications
+   - Resources
+
+Include emojis to make it visually appealing and use clear section headers.
+"""
+)
+
+# --------------------------------------------------
+# Generation
+# --------------------------------------------------
+def generate_roadmap(domain: str) -> str:
+    chain = prompt | get_llm()
+    response = chain.invoke({"domain": domain})
+    return response.content
+
+
+def stream_roadmap(domain: str):
+    chain = prompt | get_llm()
+    for chunk in chain.stream({"domain": domain}):
+        if chunk.content:
+            yield chunk.content
+
+# --------------------------------------------------
+# Roadmap cache
+# --------------------------------------------------
+def clean_domain(domain: str) -> str:
+    return " ".join(domain.split())
+
+
+def normalize_domain(domain: str) -> str:
+    # "Data Science", "data science " and "Data  science" share one entry.
+    return clean_domain(domain).casefold()
+
+
+class RoadmapCache:
+    def __init__(self, conn=None):
+        self.conn = conn or connect("roadmaps")
+        self._lock = threading.Lock()
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS roadmaps (
+                domain_key TEXT NOT NULL,
+                prompt_version INTEGER NOT NULL,
+                markdown TEXT NOT NULL,
+                created REAL NOT NULL,
+                PRIMARY KEY (domain_key, prompt_version)
+            )
+            """
+        )
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS roadmap_requests (
+                domain_key TEXT NOT NULL,
+                display TEXT NOT NULL,
+                requested REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS roadmap_requests_time "
+            "ON roadmap_requests (requested)"
+        )
+
+    def get(self, domain: str, max_age: int = ROADMAP_CACHE_TTL):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT markdown FROM roadmaps "
+                "WHERE domain_key = ? AND prompt_version = ? AND created >= ?",
+                (normalize_domain(domain), PROMPT_VERSION, time.time() - max_age)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, domain: str, markdown: str):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO roadmaps "
+                "(domain_key, prompt_version, markdown, created) "
+                "VALUES (?, ?, ?, ?)",
+                (normalize_domain(domain), PROMPT_VERSION, markdown, time.time())
+            )
+
+    def record_request(self, domain: str):
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO roadmap_requests (domain_key, display, requested) "
+                "VALUES (?, ?, ?)",
+                (normalize_domain(domain), clean_domain(domain), time.time())
+            )
+
+    def popular_domains(self, limit: int = ROADMAP_POPULAR_DOMAINS):
+        # Returns the most common spelling of each of the most requested
+        # domains within the usage window.
+        since = time.time() - ROADMAP_USAGE_WINDOW
+        with self._lock:
+            self.conn.execute(
+                "DELETE FROM roadmap_requests WHERE requested < ?", (since,)
+            )
+            keys = self.conn.execute(
+                "SELECT domain_key FROM roadmap_requests "
+                "GROUP BY domain_key ORDER BY COUNT(*) DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+            return [
+                self.conn.execute(
+                    "SELECT display FROM roadmap_requests WHERE domain_key = ? "
+                    "GROUP BY display ORDER BY COUNT(*) DESC LIMIT 1",
+                    key
+                ).fetchone()[0]
+                for key in keys
+            ]
+
+
+@st.cache_resource
+def get_roadmap_cache():
+    return RoadmapCache()
+
+# --------------------------------------------------
+# Background pre-generation
+# --------------------------------------------------
+def refresh_popular_roadmaps(cache: RoadmapCache):
+    # Regenerate popular roadmaps that are missing or will expire before
+    # the next refresh, so requests for them are always cache hits.
+    for domain in cache.popular_domains():
+        if cache.get(domain, ROADMAP_CACHE_TTL - ROADMAP_REFRESH_INTERVAL):
+            continue
+        try:
+            cache.put(domain, generate_roadmap(domain))
+            logger.info("Pre-generated roadmap for %r", domain)
+        except Exception:
+            logger.exception("Failed to pre-generate roadmap for %r", domain)
+
+
+def _pregeneration_loop(cache: RoadmapCache):
+    while True:
+        refresh_popular_roadmaps(cache)
+        time.sleep(ROADMAP_REFRESH_INTERVAL)
+
+
+@st.cache_resource
+def start_roadmap_pregeneration():
+    thread = threading.Thread(
+        target=_pregeneration_loop,
+        args=(get_roadmap_cache(),),
+        name="roadmap-pregeneration",
+        daemon=True
+    )
+    thread.start()
+    return thread
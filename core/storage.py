@@ -0,0 +1,44 @@
+import sqlite3
+
+import numpy as np
+
+from core.config import CACHE_DIR
+
+# --------------------------------------------------
+# SQLite-backed stores
+# --------------------------------------------------
+def connect(name: str) -> sqlite3.Connection:
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(
+        CACHE_DIR / f"{name}.sqlite3",
+        check_same_thread=False,
+        isolation_level=None
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+# --------------------------------------------------
+# Embedding matching
+# --------------------------------------------------
+# Stores keyed by an embedding (cached answers, question-bank topics) keep
+# unit vectors as float32 blobs, so cosine similarity is a dot product.
+def unit_vector(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def nearest_row(rows, vector, threshold: float):
+    # rows: (id, embedding blob) pairs. The id of the most similar row, or
+    # None when none reaches the threshold.
+    if not rows:
+        return None
+    matrix = np.frombuffer(
+        b"".join(row[1] for row in rows), dtype=np.float32
+    ).reshape(len(rows), -1)
+    scores = matrix @ unit_vector(vector)
+    best = int(np.argmax(scores))
+    if scores[best] < threshold:
+        return None
+    return rows[best][0]
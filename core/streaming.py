@@ -0,0 +1,34 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------------------------
+# Stream timing
+# --------------------------------------------------
+class StreamTimer:
+    def __init__(self, label: str):
+        self.label = label
+        self.first_token = None
+        self.total = None
+
+    def wrap(self, chunks):
+        started = time.perf_counter()
+        for chunk in chunks:
+            if self.first_token is None:
+                self.first_token = time.perf_counter() - started
+            yield chunk
+        self.total = time.perf_counter() - started
+
+        logger.info(
+            "%s: first token %.2fs, complete %.2fs",
+            self.label,
+            self.first_token if self.first_token is not None else self.total,
+            self.total
+        )
+
+    def summary(self) -> str:
+        if self.total is None:
+            return ""
+        first_token = self.first_token if self.first_token is not None else self.total
+        return f"First token after {first_token:.2f}s · completed in {self.total:.2f}s"
@@ -0,0 +1,179 @@
+import os
+
+import numpy as np
+from langchain_core.prompts import PromptTemplate
+
+from core.concurrency import gather_bounded, run_async
+from core.docstore import CompactDocstore
+from core.models import get_llm
+
+# --------------------------------------------------
+# Settings
+# --------------------------------------------------
+# Token budgets are per LLM call: the map step packs consecutive chunks up
+# to MAP_TOKEN_BUDGET, every reduce level packs partial summaries up to
+# REDUCE_TOKEN_BUDGET until a single final call can take them all.
+MAP_TOKEN_BUDGET = int(os.getenv("MAP_TOKEN_BUDGET", "3000"))
+REDUCE_TOKEN_BUDGET = int(os.getenv("REDUCE_TOKEN_BUDGET", "4000"))
+SECTION_CHUNKS = int(os.getenv("SECTION_CHUNKS", "40"))
+
+# --------------------------------------------------
+# Prompt Templates
+# --------------------------------------------------
+map_prompt = PromptTemplate.from_template(
+    """
+Summarize the following excerpt of a document, keeping every key concept,
+definition and example that relates to the topic: {topic}.
+Be concise (maximum ~200 words). If nothing relates to the topic, reply
+with a one-sentence summary of the excerpt.
+
+{text}
+
+Summary:
+"""
+)
+
+reduce_prompt = PromptTemplate.from_template(
+    """
+The following are summaries of consecutive parts of a document.
+Combine them into a single, well-structured summary about: {topic}.
+Remove repetition and keep the original order of ideas
+(maximum ~{words} words).
+
+{text}
+
+Combined Summary:
+"""
+)
+
+# --------------------------------------------------
+# Helpers
+# --------------------------------------------------
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def pack_indices(texts, token_budget: int):
+    # Groups consecutive texts so each group fits the budget; a text larger
+    # than the budget gets a group of its own.
+    groups = []
+    current = []
+    used = 0
+
+    for i, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if current and used + tokens > token_budget:
+            groups.append(current)
+            current = []
+            used = 0
+        current.append(i)
+        used += tokens
+
+    if current:
+        groups.append(current)
+    return groups
+
+
+def pack_texts(texts, token_budget: int):
+    return [
+        [texts[i] for i in group]
+        for group in pack_indices(texts, token_budget)
+    ]
+
+
+def chunk_text(vector_store, row: int) -> str:
+    # Compact docstores slice the text straight out of their buffer instead
+    # of building a Document per chunk.
+    docstore = vector_store.docstore
+    if isinstance(docstore, CompactDocstore):
+        return docstore.text(row)
+    return docstore.search(vector_store.index_to_docstore_id[row]).page_content
+
+
+def document_chunks(vector_store):
+    return [
+        chunk_text(vector_store, row)
+        for row in range(len(vector_store.index_to_docstore_id))
+    ]
+
+
+def section_chunks(vector_store, topic: str, k: int = SECTION_CHUNKS):
+    # The most relevant chunks for the topic, back in reading order.
+    query = np.array(
+        [vector_store.embedding_function.embed_query(topic)], dtype=np.float32
+    )
+    _, rows = vector_store.index.search(query, k)
+    return [
+        chunk_text(vector_store, row)
+        for row in sorted(int(row) for row in rows[0] if row != -1)
+    ]
+
+# --------------------------------------------------
+# Map-reduce
+# --------------------------------------------------
+async def summarize_groups(chain, groups, topic, words, on_done):
+    return await gather_bounded(
+        [
+            chain.ainvoke(
+                {"text": "\n\n".join(group), "topic": topic, "words": words}
+            )
+            for group in groups
+        ],
+        on_done=on_done
+    )
+
+
+async def collapse_summaries(texts, topic: str, emit=None):
+    # Map every chunk group concurrently, then reduce level by level until
+    # the partial summaries fit one final call.
+    llm = get_llm()
+    map_chain = map_prompt | llm
+    reduce_chain = reduce_prompt | llm
+
+    def progress(stage):
+        if emit is None:
+            return None
+        return lambda done, total: emit((stage, done, total))
+
+    groups = pack_texts(texts, MAP_TOKEN_BUDGET)
+    responses = await summarize_groups(
+        map_chain, groups, topic, None, progress("map")
+    )
+    partials = [response.content for response in responses]
+
+    level = 1
+    # A single partial is handed to the final combine as it is, even if it
+    # is over budget: reducing it alone would not shrink anything.
+    while (
+        len(partials) > 1
+        and sum(estimate_tokens(p) for p in partials) > REDUCE_TOKEN_BUDGET
+    ):
+        groups = pack_texts(partials, REDUCE_TOKEN_BUDGET)
+        if len(groups) == len(partials):
+            # Every partial fills a budget alone: merge pairwise so each
+            # level is guaranteed to shrink.
+            groups = [partials[i:i + 2] for i in range(0, len(partials), 2)]
+
+        responses = await summarize_groups(
+            reduce_chain, groups, topic, 300, progress(f"reduce {level}")
+        )
+        partials = [response.content for response in responses]
+        level += 1
+
+    return partials
+
+
+def summarize_chunks(texts, topic: str, on_progress=None):
+    # Runs the concurrent map/reduce levels, then streams the final combine
+    # so the answer starts rendering as soon as the last level is done.
+    partials = run_async(
+        lambda emit: collapse_summaries(texts, topic, emit),
+        on_event=(lambda event: on_progress(*event)) if on_progress else None
+    )
+
+    chain = reduce_prompt | get_llm()
+    for chunk in chain.stream(
+        {"text": "\n\n".join(partials), "topic": topic, "words": 1000}
+    ):
+        if chunk.content:
+            yield chunk.content
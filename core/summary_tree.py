@@ -0,0 +1,157 @@
+import os
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.prompts import PromptTemplate
+
+from core.concurrency import run_async
+from core.models import get_llm
+from core.summarize import (
+    MAP_TOKEN_BUDGET,
+    REDUCE_TOKEN_BUDGET,
+    document_chunks,
+    map_prompt,
+    pack_indices,
+    reduce_prompt,
+    summarize_groups,
+)
+
+# --------------------------------------------------
+# Settings
+# --------------------------------------------------
+TREE_SEARCH_K = int(os.getenv("TREE_SEARCH_K", "8"))
+TREE_MAX_NODES = int(os.getenv("TREE_MAX_NODES", "3"))
+
+TREE_TOPIC = "the main ideas of this part of the document"
+LEVEL_NAMES = {1: "section", 2: "chapter"}
+
+# --------------------------------------------------
+# Prompt Template
+# --------------------------------------------------
+tree_answer_prompt = PromptTemplate.from_template(
+    """
+Use the following precomputed summaries of a document to write a clear,
+structured summary about the topic below (maximum ~400 words).
+If the summaries do not cover the topic, say so.
+
+{context}
+
+Topic: {topic}
+
+Summary:
+"""
+)
+
+# --------------------------------------------------
+# Tree construction
+# --------------------------------------------------
+# Level 0 is the chunk index itself; each level above summarizes
+# consecutive groups of the level below (chunks -> sections -> chapters ->
+# ... -> one document node). Every node records the chunk span it covers.
+async def build_tree_levels(chunks, emit=None):
+    llm = get_llm()
+    chain = map_prompt | llm
+    budget = MAP_TOKEN_BUDGET
+    texts = chunks
+    spans = [(i, i) for i in range(len(chunks))]
+    levels = []
+
+    while texts:
+        groups = pack_indices(texts, budget)
+        if len(groups) == len(texts) > 1:
+            # Every node fills a budget alone: merge pairwise so each level
+            # is guaranteed to shrink.
+            groups = [
+                list(range(i, min(i + 2, len(texts))))
+                for i in range(0, len(texts), 2)
+            ]
+
+        level = len(levels) + 1
+        on_done = None
+        if emit is not None:
+            on_done = lambda done, total, level=level: emit((level, done, total))
+
+        responses = await summarize_groups(
+            chain,
+            [[texts[i] for i in group] for group in groups],
+            TREE_TOPIC,
+            300,
+            on_done
+        )
+        nodes = [
+            (response.content, spans[group[0]][0], spans[group[-1]][1])
+            for response, group in zip(responses, groups)
+        ]
+        levels.append(nodes)
+
+        if len(nodes) == 1:
+            break
+        texts = [text for text, _, _ in nodes]
+        spans = [(first, last) for _, first, last in nodes]
+        chain = reduce_prompt | llm
+        budget = REDUCE_TOKEN_BUDGET
+
+    return levels
+
+
+def level_name(level: int, top_level: int) -> str:
+    if level == top_level:
+        return "document"
+    return LEVEL_NAMES.get(level, f"level {level}")
+
+
+def build_summary_tree(vector_store, on_progress=None):
+    # None for a corpus without chunks (only scanned or blank pages).
+    chunks = document_chunks(vector_store)
+    if not chunks:
+        return None
+
+    levels = run_async(
+        lambda emit: build_tree_levels(chunks, emit),
+        on_event=(lambda event: on_progress(*event)) if on_progress else None
+    )
+
+    texts = []
+    metadatas = []
+    for level, nodes in enumerate(levels, 1):
+        for text, first_chunk, last_chunk in nodes:
+            texts.append(text)
+            metadatas.append(
+                {
+                    "level": level,
+                    "kind": level_name(level, len(levels)),
+                    "first_chunk": first_chunk,
+                    "last_chunk": last_chunk,
+                }
+            )
+
+    return FAISS.from_texts(
+        texts, vector_store.embedding_function, metadatas=metadatas
+    )
+
+# --------------------------------------------------
+# Querying
+# --------------------------------------------------
+def select_nodes(tree_store, topic: str):
+    # Broad topics land closest to chapter/document nodes, narrow ones to
+    # section nodes: answer from the level of the best match.
+    results = tree_store.similarity_search(topic, k=TREE_SEARCH_K)
+    if not results:
+        return []
+    best_level = results[0].metadata["level"]
+    return [
+        doc for doc in results if doc.metadata["level"] == best_level
+    ][:TREE_MAX_NODES]
+
+
+def stream_tree_summary(tree_store, topic: str):
+    nodes = select_nodes(tree_store, topic)
+    context = "\n\n".join(
+        f"[{doc.metadata['kind']}, chunks {doc.metadata['first_chunk'] + 1}"
+        f"-{doc.metadata['last_chunk'] + 1}]\n{doc.page_content}"
+        for doc in nodes
+    )
+
+    chain = tree_answer_prompt | get_llm()
+    for chunk in chain.stream({"context": context, "topic": topic}):
+        if chunk.content:
+            yield chunk.content
@@ -4,8 +4,13 @@ import base64
 from datetime import datetime
 
 from dotenv import load_dotenv
-from langchain.chat_models import init_chat_model
-from langchain_core.prompts import PromptTemplate
+
+from core.roadmaps import (
+    get_roadmap_cache,
+    start_roadmap_pregeneration,
+    stream_roadmap,
+)
+from core.streaming import StreamTimer
 
 # --------------------------------------------------
 # Load environment variables
@@ -19,70 +24,14 @@ if not GROQ_API_KEY:
     st.stop()
 
 # --------------------------------------------------
-# Initialize LLM (Groq)
+# Roadmap cache (shared per process)
 # --------------------------------------------------
-llm = init_chat_model(
-    "llama-3.1-8b-instant",
-    model_provider="groq"
-)
-
-# --------------------------------------------------
-# Prompt Template
-# --------------------------------------------------
-prompt = PromptTemplate.from_template(
-    """
-You are an expert curriculum designer and technical educator.
-Your task is to create a detailed learning roadmap for the domain: {domain}.
-
-Generate a comprehensive, topic-based (not time-based) roadmap that progresses
-from absolute basics to advanced expert level.
-
-Format the roadmap with:
-
-# 🚀 [Domain] Learning Roadmap
-
-## 📚 Foundation Level
-🔹 **Topic 1**:
-   - Key concepts
-   - Practical applications
-   - Resources (books/courses)
-
-🔹 **Topic 2**:
-   - Key concepts
-   - Practical applications
-   - Resources
-
-## 🏗️ Intermediate Level
-🔸 **Topic 1**:
-   - Key concepts
-   - Practical applications
-   - Resources
-
-## 🎯 Advanced Level
-🔺 **Topic 1**:
-   - Key concepts
-   - Practical applications
-   - Resources
-
-## 🏫 Expert Level
-🌟 **Topic 1**:
-   - Key concepts
-   - Practical applications
-   - Resources
-
-Include emojis to make it visually appealing and use clear section headers.
-"""
-)
+roadmap_cache = get_roadmap_cache()
+start_roadmap_pregeneration()
 
 # --------------------------------------------------
 # Core logic
 # --------------------------------------------------
-def generate_roadmap(domain: str) -> str:
-    chain = prompt | llm
-    response = chain.invoke({"domain": domain})
-    return response.content
-
-
 def create_download_link(val: bytes, filename: str) -> str:
     b64 = base64.b64encode(val).decode()
     return (
@@ -122,14 +71,27 @@ def main():
 
         with st.spinner(f"🚀 Generating {domain} roadmap..."):
             try:
-                roadmap = generate_roadmap(domain)
-
-                st.success("✅ Roadmap generated successfully!")
+                roadmap_cache.record_request(domain)
+                roadmap = roadmap_cache.get(domain)
+
+                if roadmap is not None:
+                    with st.expander("📝 View Roadmap", expanded=True):
+                        st.markdown(roadmap)
+
+                    st.success("✅ Roadmap ready!")
+                    st.caption("⚡ Served from the roadmap cache")
+                else:
+                    timer = StreamTimer("roadmap")
+                    with st.expander("📝 View Roadmap", expanded=True):
+                        roadmap = st.write_stream(
+                            timer.wrap(stream_roadmap(domain))
+                        )
+                    roadmap_cache.put(domain, roadmap)
+
+                    st.success("✅ Roadmap generated successfully!")
+                    st.caption(timer.summary())
                 st.markdown("---")
 
-                with st.expander("📝 View Roadmap", expanded=True):
-                    st.markdown(roadmap)
-
                 st.download_button(
                     label="📥 Download Markdown",
                     data=roadmap,
@@ -1,20 +1,19 @@
 import streamlit as st
 import os
-from uuid import uuid4
-from typing_extensions import List, TypedDict, Annotated
 
 from dotenv import load_dotenv
-from PyPDF2 import PdfReader
 
-import faiss
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_core.documents import Document
 from langchain_core.prompts import PromptTemplate
-from langchain.chat_models import init_chat_model
-from langgraph.graph import StateGraph
-from langchain_community.docstore.in_memory import InMemoryDocstore
-from langchain_community.vectorstores import FAISS
+
+from core.answer_cache import get_answer_cache
+from core.corpus import corpus_uploader
+from core.index_cache import get_index_cache
+from core.index_registry import get_index_registry
+from core.models import get_embeddings
+from core.rag import stream_answer
+from core.streaming import StreamTimer
+from core.summarize import document_chunks, section_chunks, summarize_chunks
+from core.summary_tree import build_summary_tree, stream_tree_summary
 
 # --------------------------------------------------
 # Load environment variables
@@ -27,23 +26,6 @@ if not GROQ_API_KEY:
     st.error("❌ GROQ_API_KEY not found. Please set it in environment variables.")
     st.stop()
 
-# --------------------------------------------------
-# Streamlit session state
-# --------------------------------------------------
-if "success" not in st.session_state:
-    st.session_state.success = False
-
-if "retriever" not in st.session_state:
-    st.session_state.retriever = None
-
-# --------------------------------------------------
-# Initialize LLM (Groq)
-# --------------------------------------------------
-llm = init_chat_model(
-    "llama-3.1-8b-instant",
-    model_provider="groq"
-)
-
 # --------------------------------------------------
 # Prompt Template
 # --------------------------------------------------
@@ -53,6 +35,7 @@ in a clear and structured manner (maximum ~1000 words).
 
 If you do not know the answer, say that you do not know.
 Do not make up information.
+Cite the page labels in square brackets (e.g. [p. 12]) of the passages you use.
 
 {context}
 
@@ -64,96 +47,33 @@ Helpful Answer:
 prompt = PromptTemplate.from_template(template)
 
 # --------------------------------------------------
-# Embeddings
+# Embeddings (shared per process)
 # --------------------------------------------------
-embeddings = HuggingFaceEmbeddings(
-    model_name="sentence-transformers/all-MiniLM-L6-v2"
-)
+embeddings = get_embeddings()
 
 # --------------------------------------------------
-# PDF processing helpers
+# Summary tree
 # --------------------------------------------------
-def get_pdf_text(pdf_docs):
-    text = ""
-    for pdf in pdf_docs:
-        reader = PdfReader(pdf)
-        for page in reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text
-    return text
-
-
-def get_text_chunks(text):
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=300,
-        add_start_index=True
-    )
-    return splitter.split_text(text)
+def get_summary_tree(corpus):
+    progress = st.progress(0.0, text="Building summary tree...")
 
+    def on_progress(level, done, total):
+        progress.progress(
+            done / total,
+            text=f"Building summary tree (level {level}): {done}/{total} nodes"
+        )
 
-def get_retriever(text_chunks):
-    index = faiss.IndexFlatL2(
-        len(embeddings.embed_query("dimension check"))
+    tree_key = f"{corpus.key}-tree"
+    lease = get_index_registry().acquire(
+        tree_key,
+        lambda: get_index_cache().load_or_build(
+            tree_key,
+            embeddings,
+            lambda: build_summary_tree(corpus.vector_store, on_progress)
+        )
     )
-
-    vector_store = FAISS(
-        embedding_function=embeddings,
-        index=index,
-        docstore=InMemoryDocstore(),
-        index_to_docstore_id={}
-    )
-
-    ids = [str(uuid4()) for _ in text_chunks]
-    vector_store.add_texts(text_chunks, ids=ids)
-
-    return vector_store.as_retriever(
-        search_type="mmr",
-        search_kwargs={"k": 1}
-    )
-
-# --------------------------------------------------
-# LangGraph State Definitions
-# --------------------------------------------------
-class Search(TypedDict):
-    query: Annotated[str, ..., "Search query"]
-
-
-class State(TypedDict):
-    question: str
-    query: Search
-    context: List[Document]
-    answer: str
-
-# --------------------------------------------------
-# Graph Nodes
-# --------------------------------------------------
-def analyze_query(state: State):
-    structured_llm = llm.with_structured_output(Search)
-    query = structured_llm.invoke(state["question"])
-    return {"query": query}
-
-
-def retrieve(state: State):
-    docs = st.session_state.retriever.invoke(
-        state["query"]["query"]
-    )
-    return {"context": docs}
-
-
-def generate(state: State):
-    context_text = "\n\n".join(
-        doc.page_content for doc in state["context"]
-    )
-    messages = prompt.invoke(
-        {
-            "question": state["question"],
-            "context": context_text
-        }
-    )
-    response = llm.invoke(messages)
-    return {"answer": response.content}
+    progress.empty()
+    return lease
 
 # --------------------------------------------------
 # Streamlit UI
@@ -161,47 +81,110 @@ def generate(state: State):
 def summary():
     st.title("📄 PDF Question Answering & Summarization")
 
-    pdf_docs = st.file_uploader(
-        "Upload PDF files and click Submit & Process",
-        accept_multiple_files=True,
-        type=["pdf"]
+    build_tree = st.checkbox(
+        "Precompute a summary tree (slower processing, near-instant topic summaries)"
+    )
+
+    corpus = corpus_uploader(
+        "Upload PDF files and click Submit & Process", "Submit & Process"
     )
 
-    if st.button("Submit & Process") and pdf_docs:
-        with st.spinner("Processing PDFs..."):
-            raw_text = get_pdf_text(pdf_docs)
-            chunks = get_text_chunks(raw_text)
-            st.session_state.retriever = get_retriever(chunks)
-            st.session_state.success = True
-            st.success(
-                f"Processed {len(pdf_docs)} PDF(s) into {len(chunks)} chunks"
-            )
-
-    if st.session_state.success:
-        user_query = st.text_area("Enter your question")
+    if corpus is not None and corpus.chunk_count == 0:
+        # Only scanned or blank pages: no text to build a tree from or to
+        # summarize.
+        st.warning(
+            "No text could be extracted from these PDFs (scanned pages are "
+            "skipped), so there is nothing to summarize."
+        )
+        return
+
+    if corpus is not None and build_tree and corpus.summary_tree is None:
+        corpus.attach_summary_tree(get_summary_tree(corpus))
+        st.caption(f"Summary tree: {corpus.summary_tree.index.ntotal} nodes")
+
+    if corpus is not None:
+        modes = [
+            mode for mode, scope in SUMMARY_MODES.items()
+            if scope != "tree" or corpus.summary_tree is not None
+        ]
+        mode = st.radio("Summary scope", modes, horizontal=True)
+        user_query = st.text_area("Enter your question or topic")
         if user_query and st.button("Generate Response"):
             with st.spinner("Generating answer..."):
-                create_summary(user_query)
+                create_summary(user_query, corpus, mode)
 
 # --------------------------------------------------
 # Graph Execution
 # --------------------------------------------------
-def create_summary(topic):
-    graph_builder = StateGraph(State)
+ANSWER_NAMESPACE = "summary"
+
+# "Focused answer" runs the RAG graph on the top chunks; "section" and
+# "document" map-reduce over the topic's most relevant chunks or the whole
+# document; "tree" answers from the precomputed summary tree.
+SUMMARY_MODES = {
+    "Focused answer": None,
+    "Section summary": "section",
+    "Whole document": "document",
+    "Summary tree": "tree",
+}
+
 
-    graph_builder.add_node("analyze_query", analyze_query)
-    graph_builder.add_node("retrieve", retrieve)
-    graph_builder.add_node("generate", generate)
+def stream_scoped_summary(topic, corpus, scope, progress):
+    vector_store = corpus.vector_store
+    if scope == "document":
+        texts = document_chunks(vector_store)
+    else:
+        texts = section_chunks(vector_store, topic)
 
-    graph_builder.add_edge("analyze_query", "retrieve")
-    graph_builder.add_edge("retrieve", "generate")
-    graph_builder.set_entry_point("analyze_query")
+    def on_progress(stage, done, total):
+        progress.progress(
+            done / total,
+            text=f"Summarizing ({stage}): {done}/{total} parts of "
+                 f"{len(texts)} chunks"
+        )
 
-    graph = graph_builder.compile()
-    result = graph.invoke({"question": topic})
+    yield from summarize_chunks(texts, topic, on_progress)
+    progress.empty()
 
+
+def create_summary(topic, corpus, mode="Focused answer"):
     st.subheader("Answer")
-    st.write(result["answer"])
+
+    scope = SUMMARY_MODES[mode]
+    namespace = ANSWER_NAMESPACE if scope is None else f"{ANSWER_NAMESPACE}:{scope}"
+
+    answer_cache = get_answer_cache()
+    question_vector = embeddings.embed_query(topic)
+    cached_answer = answer_cache.lookup(
+        namespace, corpus.key, question_vector
+    )
+    if cached_answer is not None:
+        st.write(cached_answer)
+        st.caption("⚡ Served from the answer cache")
+        return cached_answer
+
+    if scope is None:
+        chunks = stream_answer(
+            topic, corpus.retriever(), prompt, file_names=corpus.file_names
+        )
+    elif scope == "tree":
+        chunks = stream_tree_summary(corpus.summary_tree, topic)
+    else:
+        chunks = stream_scoped_summary(topic, corpus, scope, st.progress(0.0))
+
+    timer = StreamTimer(f"summary ({mode})")
+    answer = st.write_stream(timer.wrap(chunks))
+    st.caption(timer.summary())
+
+    if answer:
+        answer_cache.store(
+            namespace,
+            corpus.key,
+            topic,
+            question_vector,
+            answer
+        )
+    return answer
 
 # --------------------------------------------------
 # Run App
@@ -1,17 +1,11 @@
 import streamlit as st
 import os
-import json
 from typing import List, Dict
 
 from dotenv import load_dotenv
-from PyPDF2 import PdfReader
 
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_core.documents import Document
-from langchain_core.prompts import PromptTemplate
-from langchain.chat_models import init_chat_model
+from core.corpus import corpus_uploader
+from core.question_bank import serve_quiz
 
 # --------------------------------------------------
 # Load environment variables
@@ -27,9 +21,6 @@ if not GROQ_API_KEY:
 # --------------------------------------------------
 # Session State Initialization
 # --------------------------------------------------
-if "pdf_processed" not in st.session_state:
-    st.session_state.pdf_processed = False
-
 if "questions_generated" not in st.session_state:
     st.session_state.questions_generated = False
 
@@ -40,98 +31,49 @@ if "score" not in st.session_state:
     st.session_state.score = None
 
 # --------------------------------------------------
-# Initialize Embeddings & LLM
-# --------------------------------------------------
-embeddings = HuggingFaceEmbeddings(
-    model_name="sentence-transformers/all-MiniLM-L6-v2"
-)
-
-llm = init_chat_model(
-    "llama-3.1-8b-instant",
-    model_provider="groq"
-)
-
-# --------------------------------------------------
-# PDF Processing
+# Question Generation
 # --------------------------------------------------
-def extract_text_from_pdfs(pdf_files):
-    text = ""
-    for pdf_file in pdf_files:
-        reader = PdfReader(pdf_file)
-        for page in reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text
-    return text
-
-
-def split_text_into_chunks(text):
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200,
-        length_function=len,
-        is_separator_regex=False,
-    )
-    chunks = splitter.split_text(text)
-    return [Document(page_content=chunk) for chunk in chunks]
+def generate_questions(topic: str, corpus, num_questions: int = 10):
+    progress = st.progress(0.0, text="Generating quiz shards...")
 
+    def on_progress(round_number, done, total):
+        label = "Generating" if round_number == 0 else "Topping up"
+        progress.progress(
+            done / total,
+            text=f"{label} questions: {done}/{total} shards done"
+        )
 
-def create_vector_store(chunks):
-    return FAISS.from_documents(chunks, embeddings)
-
-# --------------------------------------------------
-# Question Generation
-# --------------------------------------------------
-def generate_questions(topic: str, vector_store, num_questions: int = 10):
-    docs = vector_store.similarity_search(topic, k=3)
-    context = "\n\n".join(doc.page_content for doc in docs)
-
-    prompt = PromptTemplate.from_template(
-        """
-You are an expert quiz maker.
-
-Generate {num_questions} multiple choice questions based on the context below.
-Each question must have 4 options (a, b, c, d) and exactly one correct answer.
-
-Return ONLY valid JSON in the following structure:
-
-{
-  "questions": [
-    {
-      "question": "question text",
-      "options": {
-        "a": "option a",
-        "b": "option b",
-        "c": "option c",
-        "d": "option d"
-      },
-      "correct_answer": "a"
-    }
-  ]
-}
-
-Context:
-{context}
-
-Topic:
-{topic}
-"""
+    preview = st.container()
+    previewed = []
+
+    def on_question(question):
+        # New questions render as soon as their JSON object closes.
+        previewed.append(question)
+        preview.markdown(f"✍️ **{len(previewed)}.** {question['question']}")
+
+    questions, from_bank = serve_quiz(
+        corpus.vector_store,
+        corpus.key,
+        topic,
+        num_questions,
+        on_progress=on_progress,
+        on_question=on_question
     )
-
-    chain = prompt | llm
-    response = chain.invoke(
-        {
-            "num_questions": num_questions,
-            "context": context,
-            "topic": topic,
-        }
+    progress.empty()
+    st.caption(
+        f"📚 {from_bank} question(s) from the question bank, "
+        f"{max(len(questions) - from_bank, 0)} newly generated"
     )
 
-    try:
-        return json.loads(response.content)
-    except json.JSONDecodeError:
+    if not questions:
         st.error("❌ Failed to parse quiz questions. Please try again.")
         return None
+    if len(questions) < num_questions:
+        st.warning(
+            f"⚠️ Only {len(questions)} distinct questions could be generated "
+            "for this topic."
+        )
+    return {"questions": questions}
 
 # --------------------------------------------------
 # Quiz Display & Evaluation
@@ -182,32 +124,32 @@ def main():
 
     # Step 1: Upload PDFs
     with st.expander("Step 1: Upload PDF Files", expanded=True):
-        pdf_files = st.file_uploader(
-            "Upload PDF files",
-            type=["pdf"],
-            accept_multiple_files=True,
-        )
+        corpus = corpus_uploader("Upload PDF files", "Process PDFs")
 
-        if pdf_files and st.button("Process PDFs"):
-            with st.spinner("Processing PDFs..."):
-                text = extract_text_from_pdfs(pdf_files)
-                chunks = split_text_into_chunks(text)
-                st.session_state.vector_store = create_vector_store(chunks)
-                st.session_state.pdf_processed = True
-                st.success("✅ PDFs processed successfully!")
+    if corpus is not None and corpus.chunk_count == 0:
+        # Only scanned or blank pages: no text to generate questions from.
+        st.warning(
+            "No text could be extracted from these PDFs (scanned pages are "
+            "skipped), so there is nothing to generate questions from."
+        )
+        return
 
     # Step 2: Generate Questions
-    if st.session_state.pdf_processed:
+    if corpus is not None:
         with st.expander("Step 2: Generate Questions", expanded=True):
             topic = st.text_input(
                 "Enter a topic from the PDF:",
                 placeholder="e.g., machine learning, operating systems",
             )
 
+            num_questions = st.slider(
+                "Number of questions", min_value=5, max_value=50, value=10, step=5
+            )
+
             if topic and st.button("Generate Quiz"):
                 with st.spinner("Generating quiz..."):
                     questions_data = generate_questions(
-                        topic, st.session_state.vector_store
+                        topic, corpus, num_questions
                     )
                     if questions_data:
                         st.session_state.questions_data = questions_data
@@ -234,7 +176,7 @@ def main():
                     )
 
     # Reset
-    if st.session_state.pdf_processed and st.button("Start Over"):
+    if corpus is not None and st.button("Start Over"):
         st.session_state.clear()
         st.rerun()
 
@@ -0,0 +1,194 @@
+import queue
+import random
+import threading
+
+import pytest
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from core.chunker import Chunker
+from core.extraction import PageText
+from core.pipeline import PAGE_SEPARATOR, _DONE, _chunk_stage
+
+PIECES = ["word ", "longerword ", "x" * 37, "\n", "\n\n", " ", "ab cd ", "  \n "]
+
+
+def random_text(rng, n_pieces):
+    return "".join(rng.choice(PIECES) for _ in range(n_pieces))
+
+
+def paragraph_text(rng, n_paragraphs):
+    words = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta", "theta"]
+    paragraphs = []
+    for _ in range(n_paragraphs):
+        lines = [
+            " ".join(rng.choices(words, k=rng.randint(8, 14)))
+            for _ in range(rng.randint(3, 8))
+        ]
+        paragraphs.append("\n".join(lines))
+    return "\n\n".join(paragraphs)
+
+# --------------------------------------------------
+# Chunker
+# --------------------------------------------------
+def test_overlap_must_be_smaller_than_chunk_size():
+    with pytest.raises(ValueError):
+        Chunker(100, 100)
+
+
+def test_spans_are_bounded_stripped_and_ordered():
+    rng = random.Random(0)
+    chunker = Chunker(200, 40)
+    for _ in range(50):
+        text = random_text(rng, rng.randint(0, 800))
+        starts, ends = chunker.spans(text)
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            chunk = text[start:end]
+            assert 0 < len(chunk) <= 200
+            assert chunk == chunk.strip()
+        assert list(starts) == sorted(starts)
+        assert list(ends) == sorted(ends)
+
+
+def test_spans_cover_all_text():
+    rng = random.Random(1)
+    chunker = Chunker(200, 40)
+    text = random_text(rng, 2000)
+    covered = bytearray(len(text))
+    for start, end in zip(*chunker.spans(text)):
+        covered[start:end] = b"\x01" * (end - start)
+    assert all(covered[i] or text[i].isspace() for i in range(len(text)))
+
+
+def test_split_text_matches_spans():
+    text = paragraph_text(random.Random(2), 40)
+    chunker = Chunker(300, 60)
+    starts, ends = chunker.spans(text)
+    assert chunker.split_text(text) == [
+        text[start:end] for start, end in zip(starts, ends)
+    ]
+
+
+def test_unbroken_text_is_hard_cut_with_overlap():
+    text = "x" * 1000
+    starts, ends = Chunker(300, 50).spans(text)
+    assert ends.tolist()[:3] == [300, 550, 800]
+    assert starts.tolist()[:3] == [0, 250, 500]
+
+
+@pytest.mark.parametrize("trial", range(200))
+def test_partial_spans_resume_like_whole_text(trial):
+    # Chunking text as it arrives, resuming where partial_spans says, must
+    # give the spans of chunking it all at once.
+    rng = random.Random(trial)
+    chunker = Chunker(rng.choice([50, 200, 1000]), rng.choice([0, 10, 40]))
+    text = random_text(rng, rng.randint(100, 3000))
+    expected = list(zip(*[a.tolist() for a in chunker.spans(text)]))
+
+    spans = []
+    base, buffer, rest = 0, "", text
+    while rest:
+        step = rng.randint(1, 2500)
+        buffer, rest = buffer + rest[:step], rest[step:]
+        starts, ends, resume = chunker.partial_spans(buffer)
+        spans += [(base + s, base + e) for s, e in zip(starts.tolist(), ends.tolist())]
+        base, buffer = base + resume, buffer[resume:]
+    starts, ends = chunker.spans(buffer)
+    spans += [(base + s, base + e) for s, e in zip(starts.tolist(), ends.tolist())]
+
+    assert spans == expected
+
+
+def test_spans_from_start_offset():
+    text = paragraph_text(random.Random(3), 20)
+    chunker = Chunker(300, 60)
+    offset = text.index("\n\n") + 2
+    starts, ends = chunker.spans(text, offset)
+    expected_starts, expected_ends = chunker.spans(text[offset:])
+    assert (starts - offset).tolist() == expected_starts.tolist()
+    assert (ends - offset).tolist() == expected_ends.tolist()
+
+
+def test_no_more_chunks_than_recursive_splitter():
+    rng = random.Random(4)
+    pages = [paragraph_text(rng, rng.randint(3, 6)) for _ in range(50)]
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    chunker = Chunker(1000, 200)
+    layouts = [
+        "\n".join(pages),
+        "\n".join(page.replace("\n\n", "\n") for page in pages),
+        "\n".join(page.replace("\n", " ") for page in pages),
+    ]
+    for text in layouts:
+        assert len(chunker.split_text(text)) <= len(splitter.split_text(text))
+
+# --------------------------------------------------
+# Streaming chunk stage
+# --------------------------------------------------
+def run_chunk_stage(chunker, pages, file_offset=0):
+    pages_in = queue.Queue()
+    batches_out = queue.Queue()
+    for page in pages:
+        pages_in.put(page)
+    pages_in.put(_DONE)
+
+    _chunk_stage(chunker, pages_in, batches_out, threading.Event(), file_offset)
+
+    chunks = []
+    while True:
+        item = batches_out.get_nowait()
+        if item is _DONE:
+            return chunks
+        chunks.extend(item[0])
+
+
+def make_pages(rng, n_files, n_pages):
+    pages = []
+    for file_index in range(n_files):
+        for page_number in range(n_pages):
+            blank = rng.random() < 0.1
+            text = " \n" if blank else paragraph_text(rng, rng.randint(1, 4))
+            pages.append(PageText(file_index, page_number, text, 0.0))
+    return pages
+
+
+def test_chunk_stage_matches_chunking_each_file():
+    rng = random.Random(5)
+    chunker = Chunker(300, 60)
+    pages = make_pages(rng, 3, 15)
+
+    chunks = run_chunk_stage(chunker, pages)
+
+    expected = []
+    for file_index in range(3):
+        text = "".join(
+            page.text + PAGE_SEPARATOR
+            for page in pages
+            if page.file_index == file_index and page.text.strip()
+        )
+        expected += [(file_index, chunk) for chunk in chunker.split_text(text)]
+    assert [(chunk.file_index, chunk.text) for chunk in chunks] == expected
+
+
+def test_chunk_stage_maps_chunks_to_pages():
+    rng = random.Random(6)
+    chunker = Chunker(300, 60)
+    pages = make_pages(rng, 2, 20)
+    page_text = {
+        (page.file_index + 4, page.page_number): page.text + PAGE_SEPARATOR
+        for page in pages
+    }
+
+    chunks = run_chunk_stage(chunker, pages, file_offset=4)
+
+    assert chunks
+    for chunk in chunks:
+        # A chunk starts on its page; it may run on into the next pages.
+        text = page_text[(chunk.file_index, chunk.page)]
+        assert text[chunk.start:].strip()
+        assert chunk.text.startswith(text[chunk.start:chunk.start + len(chunk.text)])
+    assert {chunk.file_index for chunk in chunks} == {4, 5}
+    blank_pages = {
+        (page.file_index + 4, page.page_number)
+        for page in pages if not page.text.strip()
+    }
+    assert not blank_pages & {(chunk.file_index, chunk.page) for chunk in chunks}
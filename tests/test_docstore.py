@@ -0,0 +1,110 @@
+import pytest
+from langchain_core.documents import Document
+
+from core.docstore import Chunk, CompactDocstore, RowIds
+
+
+def make_docstore():
+    docstore = CompactDocstore()
+    docstore.extend(
+        [
+            Chunk("first chunk", 0, 0, 0),
+            Chunk("second – ünïcode", 0, 1, 12),
+            Chunk("third chunk", 1, 0, 0),
+            Chunk("fourth chunk", 2, 3, 40),
+            Chunk("fifth chunk", 2, 4, 0),
+        ]
+    )
+    return docstore
+
+# --------------------------------------------------
+# Row ids
+# --------------------------------------------------
+def test_row_ids_are_an_identity_mapping():
+    rows = RowIds(3)
+    assert len(rows) == 3
+    assert rows[2] == 2
+    assert list(rows.items()) == [(0, 0), (1, 1), (2, 2)]
+    assert 3 not in rows
+    assert rows.get(5) is None
+    with pytest.raises(KeyError):
+        rows[3]
+
+
+def test_row_ids_update_must_continue_the_sequence():
+    rows = RowIds(2)
+    rows.update({2: "2"})
+    assert len(rows) == 3
+    with pytest.raises(ValueError):
+        rows.update({5: "5"})
+
+# --------------------------------------------------
+# Compact docstore
+# --------------------------------------------------
+def test_search_returns_documents_with_row_ids():
+    docstore = make_docstore()
+    doc = docstore.search("1")
+    assert doc.id == "1"
+    assert doc.page_content == "second – ünïcode"
+    assert doc.metadata == {"file_index": 0, "page": 1, "start_index": 12}
+    assert docstore.search(1).page_content == doc.page_content
+    assert docstore.search("9") == "ID 9 not found."
+    assert docstore.search("x") == "ID x not found."
+
+
+def test_add_requires_ids_continuing_the_rows():
+    docstore = make_docstore()
+    docstore.add(
+        {"5": Document(page_content="sixth", metadata={"page": 2, "file_index": 3})}
+    )
+    assert docstore.text(5) == "sixth"
+    assert docstore.metadata(5)["file_index"] == 3
+    with pytest.raises(ValueError):
+        docstore.add({"9": Document(page_content="gap")})
+    with pytest.raises(ValueError):
+        docstore.add({"abc": Document(page_content="not a row")})
+
+
+def test_delete_points_to_remove_files():
+    with pytest.raises(ValueError, match="remove_files"):
+        make_docstore().delete(["0"])
+
+
+def test_without_files_drops_rows_and_renumbers_files():
+    docstore = make_docstore()
+    kept, removed = docstore.without_files([1])
+
+    assert removed.tolist() == [2]
+    assert len(kept) == 4
+    assert [kept.text(row) for row in range(4)] == [
+        "first chunk", "second – ünïcode", "fourth chunk", "fifth chunk"
+    ]
+    assert kept.file_indices().tolist() == [0, 0, 1, 1]
+    assert kept.metadata(2) == {"file_index": 1, "page": 3, "start_index": 40}
+    # The original is untouched.
+    assert len(docstore) == 5
+
+
+def test_without_several_files():
+    kept, removed = make_docstore().without_files([0, 2])
+    assert removed.tolist() == [0, 1, 3, 4]
+    assert [kept.text(row) for row in range(len(kept))] == ["third chunk"]
+    assert kept.file_indices().tolist() == [0]
+
+
+def test_save_and_load_memory_maps(tmp_path):
+    docstore = make_docstore()
+    docstore.save(tmp_path)
+    loaded = CompactDocstore.load(tmp_path)
+
+    assert loaded.nbytes == 0
+    assert len(loaded) == len(docstore)
+    for row in range(len(docstore)):
+        assert loaded.text(row) == docstore.text(row)
+        assert loaded.metadata(row) == docstore.metadata(row)
+
+    # Growing a loaded store copies it out of the mapping first.
+    loaded.extend([Chunk("sixth chunk", 3, 0, 0)])
+    assert loaded.nbytes > 0
+    assert loaded.text(5) == "sixth chunk"
+    assert CompactDocstore.load(tmp_path).search("5") == "ID 5 not found."
@@ -0,0 +1,95 @@
+import threading
+import time
+
+import pytest
+
+import core.index_registry as index_registry
+from core.index_registry import IndexRegistry
+
+
+class FakeStore:
+    def __init__(self, nbytes=10):
+        self.nbytes = nbytes
+
+
+@pytest.fixture(autouse=True)
+def fake_memory_accounting(monkeypatch):
+    monkeypatch.setattr(
+        index_registry, "vector_store_memory_bytes", lambda store: store.nbytes
+    )
+
+
+def test_failed_load_leaves_no_key_lock():
+    registry = IndexRegistry(max_bytes=100)
+
+    def failing_load():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        registry.acquire("key", failing_load)
+    assert registry._key_locks == {}
+    assert registry.total_bytes() == 0
+
+    lease = registry.acquire("key", lambda: (FakeStore(), False))
+    assert not lease.resident
+    assert registry._key_locks == {}
+
+
+def test_concurrent_acquires_load_once():
+    registry = IndexRegistry(max_bytes=100)
+    loads = []
+
+    def slow_load():
+        loads.append(1)
+        time.sleep(0.1)
+        return FakeStore(), False
+
+    leases = []
+    threads = [
+        threading.Thread(target=lambda: leases.append(registry.acquire("key", slow_load)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+    assert len(leases) == 8
+    assert len({id(lease.vector_store) for lease in leases}) == 1
+    assert sum(lease.resident for lease in leases) == 7
+    assert registry._entries["key"].refs == 8
+    assert registry._key_locks == {}
+
+
+def test_released_stores_are_evicted_least_recently_used_first():
+    registry = IndexRegistry(max_bytes=25)
+    first = registry.acquire("first", lambda: (FakeStore(10), False))
+    second = registry.acquire("second", lambda: (FakeStore(10), False))
+
+    first.release()
+    second.release()
+    assert registry.total_bytes() == 20
+
+    third = registry.acquire("third", lambda: (FakeStore(10), False))
+    assert list(registry._entries) == ["second", "third"]
+
+    # Stores still leased are kept even over budget.
+    fourth = registry.acquire("fourth", lambda: (FakeStore(30), False))
+    assert "third" in registry._entries and "fourth" in registry._entries
+    assert "second" not in registry._entries
+    third.release()
+    fourth.release()
+
+
+def test_release_is_idempotent():
+    registry = IndexRegistry(max_bytes=100)
+    lease = registry.acquire("key", lambda: (FakeStore(), True))
+    again = registry.acquire("key", lambda: pytest.fail("reloaded"))
+    assert again.resident and lease.cached
+
+    lease.release()
+    lease.release()
+    assert registry._entries["key"].refs == 1
+    again.release()
+    assert registry._entries["key"].refs == 0
@@ -0,0 +1,66 @@
+import json
+import random
+
+import pytest
+
+from core.json_stream import JsonArrayStreamParser
+
+QUESTIONS = [
+    {
+        "question": f'Question {i} with "quotes", [brackets] and {{braces}}?',
+        "options": {"a": "1", "b": "2", "c": "3", "d": "4"},
+        "correct_answer": "a",
+    }
+    for i in range(6)
+]
+
+
+def feed_in_pieces(text, seed=0):
+    rng = random.Random(seed)
+    parser = JsonArrayStreamParser()
+    items = []
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, 7)
+        items += parser.feed(text[position:position + size])
+        position += size
+    return items
+
+
+@pytest.mark.parametrize(
+    "preamble",
+    [
+        "",
+        "```json\n",
+        "Sure [JSON below]: ",
+        'Here are "your questions: ',
+        "[not json] ",
+        "[{broken}] ",
+    ],
+)
+def test_objects_of_the_question_array_are_streamed(preamble):
+    text = preamble + json.dumps({"questions": QUESTIONS}) + '\n``` done "bye'
+    assert feed_in_pieces(text) == QUESTIONS
+
+
+def test_bare_array():
+    assert feed_in_pieces(json.dumps(QUESTIONS)) == QUESTIONS
+
+
+def test_items_arrive_as_soon_as_they_close():
+    parser = JsonArrayStreamParser()
+    first = '{"questions": [' + json.dumps(QUESTIONS[0])
+    rest = ", " + json.dumps(QUESTIONS[1]) + "]}"
+    assert parser.feed(first) == [QUESTIONS[0]]
+    assert parser.feed(rest) == [QUESTIONS[1]]
+
+
+def test_malformed_and_truncated_items_only_lose_themselves():
+    good = json.dumps(QUESTIONS[0])
+    text = '{"questions": [' + good + ', {"question": bad}, ' + good + ', {"question": "cut'
+    assert feed_in_pieces(text) == [QUESTIONS[0], QUESTIONS[0]]
+
+
+def test_later_arrays_are_ignored():
+    text = json.dumps({"questions": QUESTIONS[:1], "extra": [{"x": 1}]})
+    assert feed_in_pieces(text) == QUESTIONS[:1]
@@ -0,0 +1,172 @@
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from core.docstore import Chunk, CompactDocstore, RowIds
+from core.retrieval import (
+    format_context,
+    multi_query_search,
+    pack_context,
+    reciprocal_rank_fusion,
+)
+
+# --------------------------------------------------
+# Fixtures
+# --------------------------------------------------
+class KeywordEmbeddings(Embeddings):
+    # One dimension per keyword, normalised, so the nearest vectors share
+    # the most keywords.
+    KEYWORDS = ["tcp", "udp", "ip", "dns", "http", "tls"]
+
+    def __init__(self):
+        self.calls = []
+
+    def _embed(self, text):
+        words = text.lower().split()
+        vector = np.array([words.count(k) for k in self.KEYWORDS], dtype=np.float32)
+        vector += 0.01
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+def make_store(texts):
+    embeddings = KeywordEmbeddings()
+    index = faiss.IndexFlatL2(len(KeywordEmbeddings.KEYWORDS))
+    index.add(np.asarray([embeddings._embed(t) for t in texts], dtype=np.float32))
+    docstore = CompactDocstore()
+    docstore.extend(Chunk(text, 0, row, 0) for row, text in enumerate(texts))
+    store = FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=RowIds(len(texts)),
+    )
+    embeddings.calls.clear()
+    return store
+
+
+TEXTS = [
+    "tcp tcp tcp",
+    "udp udp udp",
+    "tcp udp",
+    "dns dns",
+    "http tls",
+    "tcp tcp udp",
+    "ip ip",
+]
+
+# --------------------------------------------------
+# Reciprocal rank fusion
+# --------------------------------------------------
+def test_rrf_rewards_rows_found_by_several_queries():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [4, 2, 5]])
+    assert fused[0] == 2
+    assert set(fused) == {1, 2, 3, 4, 5}
+
+
+def test_rrf_skips_missing_hits_and_breaks_ties_by_row():
+    assert reciprocal_rank_fusion([[3, -1], [1, -1]]) == [1, 3]
+
+# --------------------------------------------------
+# Multi-query search
+# --------------------------------------------------
+def test_sub_queries_are_embedded_in_one_batch():
+    store = make_store(TEXTS)
+    multi_query_search(store, ["tcp", "udp", "tcp", " "], k=2)
+    assert store.embedding_function.calls == [["tcp", "udp"]]
+
+
+def test_every_sub_query_keeps_its_best_hit():
+    store = make_store(TEXTS)
+    docs = multi_query_search(store, ["tcp", "udp"], k=1)
+    texts = [doc.page_content for doc in docs]
+    assert len(texts) == 2
+    assert "tcp tcp tcp" in texts and "udp udp udp" in texts
+
+
+def test_mmr_prefers_diverse_candidates():
+    store = make_store(["tcp"] * 4 + ["tcp udp", "tcp ip", "dns"])
+    plain = multi_query_search(store, ["tcp"], k=3)
+    diverse = multi_query_search(store, ["tcp"], k=3, mmr=True, lambda_mult=0.3)
+    copies = lambda docs: sum(doc.page_content == "tcp" for doc in docs)
+    assert copies(plain) == 3
+    assert copies(diverse) == 1
+    assert len(diverse) == 3
+
+
+def test_empty_store_returns_nothing():
+    store = make_store(["tcp"])
+    store.index.reset()
+    assert multi_query_search(store, ["tcp"], k=2) == []
+
+# --------------------------------------------------
+# Context packing
+# --------------------------------------------------
+def chunk_doc(row, text, file_index=0, page=0):
+    return Document(
+        id=str(row),
+        page_content=text,
+        metadata={"file_index": file_index, "page": page, "start_index": 0},
+    )
+
+
+def test_adjacent_chunks_merge_without_repeating_the_overlap():
+    docs = [
+        chunk_doc(6, "overlap text and the end", page=3),
+        chunk_doc(5, "the start with overlap text", page=2),
+    ]
+    packed = pack_context(docs)
+    assert len(packed) == 1
+    assert packed[0].page_content == "the start with overlap text and the end"
+    assert packed[0].metadata["chunks"] == 2
+    assert packed[0].metadata["page"] == 2
+    assert packed[0].metadata["last_page"] == 3
+
+
+def test_duplicates_are_dropped_and_relevance_order_kept():
+    docs = [
+        chunk_doc(9, "best match"),
+        chunk_doc(2, "second match"),
+        chunk_doc(9, "best match"),
+        Document(page_content="second match"),
+        chunk_doc(4, "other file", file_index=1),
+    ]
+    packed = pack_context(docs)
+    assert [doc.page_content for doc in packed] == [
+        "best match", "second match", "other file"
+    ]
+
+
+def test_rows_of_different_files_never_merge():
+    packed = pack_context([chunk_doc(1, "a", 0), chunk_doc(2, "b", 1)])
+    assert len(packed) == 2
+
+
+def test_budget_limits_context_but_keeps_the_best_chunk():
+    docs = [chunk_doc(row * 2, str(row) * 400) for row in range(10)]
+    packed = pack_context(docs, token_budget=250)
+    assert [doc.id for doc in packed] == ["0", "2"]
+    # The best chunk is kept even when it alone is over budget.
+    assert len(pack_context(docs, token_budget=10)) == 1
+
+
+def test_format_context_labels_pages():
+    passages = [
+        Document(page_content="one", metadata={"file_index": 0, "page": 0}),
+        Document(page_content="two", metadata={"file_index": 1, "page": 4, "last_page": 5}),
+        Document(page_content="three"),
+    ]
+    assert format_context(passages, ["a.pdf"]) == (
+        "[p. 1]\none\n\n[p. 5–6]\ntwo\n\nthree"
+    )
+    assert format_context(passages[:2], ["a.pdf", "b.pdf"]) == (
+        "[a.pdf, p. 1]\none\n\n[b.pdf, p. 5–6]\ntwo"
+    )